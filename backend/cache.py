@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from backend.db import db_connection
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# How long a data version is trusted before asking Postgres again
+DATA_VERSION_TTL_S = float(os.getenv("DATA_VERSION_TTL_S", "5"))
+CACHE_MAX_AGE_S = int(os.getenv("CACHE_MAX_AGE_S", "60"))
+
+# The read APIs change when a scrape run or compute_scores finishes,
+# when detect_changes bumps the change-type rollup, and whenever
+# company_latest is refreshed or rebuilt (projection_version), including
+# mid-run
+DATA_VERSION_SQL = """
+    SELECT
+        (SELECT MAX(id) FROM scrape_runs),
+        (SELECT MAX(ended_at) FROM scrape_runs),
+        (SELECT MAX(last_updated) FROM company_scores),
+        (SELECT SUM(change_count) FROM trend_change_type_counts),
+        (SELECT version FROM projection_version)
+"""
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "not_modified": 0,
+    "version_checks": 0,
+}
+
+
+class ResponseCache:
+    """
+    Small thread-safe LRU of serialized response bodies.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+_version = {"value": None, "checked_at": 0.0}
+_version_lock = threading.Lock()
+
+
+def _version_from_row(row) -> str:
+    raw = ":".join(str(v) for v in row)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _remember_version(version):
+    with _version_lock:
+        if version != _version["value"]:
+            # Everything cached under the old version is now stale
+            _cache.clear()
+            _version["value"] = version
+        _version["checked_at"] = time.monotonic()
+
+
+def _cached_version():
+    if time.monotonic() - _version["checked_at"] < DATA_VERSION_TTL_S:
+        return _version["value"]
+    return None
+
+
+def current_data_version(db) -> str:
+    version = _cached_version()
+    if version is not None:
+        return version
+
+    _stats["version_checks"] += 1
+    cur = db.cursor()
+    try:
+        cur.execute(DATA_VERSION_SQL)
+        version = _version_from_row(cur.fetchone())
+    finally:
+        cur.close()
+
+    _remember_version(version)
+    return version
+
+
+def data_version() -> str:
+    """
+    Data version for code outside a request's DB dependency; borrows a
+    pooled connection only when the cached version has expired.
+    """
+    version = _cached_version()
+    if version is not None:
+        return version
+
+    with db_connection() as db:
+        return current_data_version(db)
+
+
+async def current_data_version_async(pool) -> str:
+    version = _cached_version()
+    if version is not None:
+        return version
+
+    _stats["version_checks"] += 1
+    row = await pool.fetchrow(DATA_VERSION_SQL)
+    version = _version_from_row(tuple(row))
+
+    _remember_version(version)
+    return version
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    candidates = [t.strip() for t in header.split(",")]
+    return "*" in candidates or any(
+        t.removeprefix("W/") == etag for t in candidates
+    )
+
+
+def _lookup(request: Request, version: str):
+    """
+    Returns (response_or_none, cache_key, cache_headers).
+    """
+    etag = f'"{version}"'
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE_S}, must-revalidate",
+    }
+
+    if _etag_matches(request, etag):
+        _stats["not_modified"] += 1
+        return Response(status_code=304, headers=cache_headers), None, cache_headers
+
+    key = (version, request.url.path, request.url.query)
+    cached = _cache.get(key)
+    if cached is not None:
+        _stats["hits"] += 1
+        body, headers = cached
+        return _json_response(body, {**headers, **cache_headers}), None, cache_headers
+
+    _stats["misses"] += 1
+    return None, key, cache_headers
+
+
+def _serialize(payload) -> bytes:
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _json_response(body: bytes, headers: dict) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_json(request: Request, db, build) -> Response:
+    """
+    Serve a JSON endpoint through the ETag / LRU cache.
+
+    `build(headers)` produces the payload on a miss and may add response
+    headers (e.g. pagination cursors) that are cached with the body.
+    """
+    response, key, cache_headers = _lookup(request, current_data_version(db))
+    if response is not None:
+        return response
+
+    headers = {}
+    body = _serialize(build(headers))
+    _cache.put(key, (body, headers))
+    return _json_response(body, {**headers, **cache_headers})
+
+
+async def cached_json_async(request: Request, pool, build) -> Response:
+    """
+    Async variant of cached_json for endpoints on the asyncpg pool;
+    `build(headers)` is awaited on a miss.
+    """
+    version = await current_data_version_async(pool)
+    response, key, cache_headers = _lookup(request, version)
+    if response is not None:
+        return response
+
+    headers = {}
+    payload = await build(headers)
+    body = _serialize(payload)
+    _cache.put(key, (body, headers))
+    return _json_response(body, {**headers, **cache_headers})
+
+
+def cache_stats() -> dict:
+    return {
+        "entries": len(_cache),
+        "max_entries": RESPONSE_CACHE_SIZE,
+        "data_version": _version["value"],
+        **_stats,
+    }
@@ -1,5 +1,10 @@
 import os
+import time
+import threading
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool as pg_pool
 from fastapi import HTTPException
 from dotenv import load_dotenv
 from pathlib import Path
@@ -15,10 +20,144 @@ load_dotenv(dotenv_path=ENV_PATH)
 # --------------------------------------------------
 DATABASE_URL = os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
 
+# --------------------------------------------------
+# Pool settings
+# --------------------------------------------------
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Idle connections older than this are pinged before being handed out
+DB_POOL_CHECK_AFTER_S = float(os.getenv("DB_POOL_CHECK_AFTER_S", "30"))
+# How long a request waits for a free connection before failing
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+# psycopg2 pools raise instead of waiting when exhausted, so gate checkouts
+_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_last_used = {}
+_stats = {
+    "checkouts": 0,
+    "health_check_failures": 0,
+    "connect_errors": 0,
+}
+
+
+def init_pool():
+    """
+    Create the shared connection pool and pre-warm DB_POOL_MIN connections.
+    Safe to call more than once.
+    """
+    global _pool
+
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL not set. Database is required.")
+
+    with _pool_lock:
+        if _pool is None:
+            # ThreadedConnectionPool opens `minconn` connections up front
+            _pool = pg_pool.ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                DATABASE_URL
+            )
+            now = time.monotonic()
+            for conn in _pool._pool:
+                _last_used[id(conn)] = now
+    return _pool
+
+
+def close_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
+
+def _is_healthy(conn) -> bool:
+    if conn.closed:
+        return False
+
+    now = time.monotonic()
+    idle_for = now - _last_used.setdefault(id(conn), now)
+    if idle_for < DB_POOL_CHECK_AFTER_S:
+        return True
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def acquire():
+    """
+    Check a healthy connection out of the pool. Broken connections
+    (e.g. dropped by Neon while idle) are discarded and replaced.
+    """
+    pool = _pool or init_pool()
+
+    if not _slots.acquire(timeout=DB_POOL_TIMEOUT_S):
+        raise pg_pool.PoolError("connection pool exhausted")
+
+    try:
+        # Every pooled connection may be stale; a fresh one is opened at the end
+        for _ in range(DB_POOL_MAX + 1):
+            conn = pool.getconn()
+            if _is_healthy(conn):
+                _stats["checkouts"] += 1
+                return conn
+
+            _stats["health_check_failures"] += 1
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+
+        raise psycopg2.OperationalError("No healthy database connection available")
+
+    except Exception:
+        _slots.release()
+        raise
+
+
+def release(conn):
+    """
+    Return a connection to the pool. Any open transaction is rolled back
+    by the pool so the next borrower starts clean.
+    """
+    try:
+        if _pool is None:
+            conn.close()
+            return
+
+        _last_used[id(conn)] = time.monotonic()
+        _pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _slots.release()
+
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a pooled connection for scripts and services:
+
+        with db_connection() as conn:
+            ...
+    """
+    conn = acquire()
+    try:
+        yield conn
+    finally:
+        release(conn)
+
 
 def get_db():
     """
-    FastAPI dependency that returns a PostgreSQL connection.
+    FastAPI dependency that yields a pooled PostgreSQL connection and
+    always returns it to the pool once the request is done.
     """
 
     if not DATABASE_URL:
@@ -28,11 +167,37 @@ def get_db():
         )
 
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        conn = acquire()
 
     except Exception as e:
+        _stats["connect_errors"] += 1
         raise HTTPException(
             status_code=500,
             detail=f"Database connection failed: {e}"
-        )
\ No newline at end of file
+        )
+
+    try:
+        yield conn
+    finally:
+        release(conn)
+
+
+def pool_stats() -> dict:
+    """
+    Snapshot of pool usage for the metrics endpoint.
+    """
+    if _pool is None:
+        return {"initialized": False, **_stats}
+
+    with _pool._lock:
+        in_use = len(_pool._used)
+        idle = len(_pool._pool)
+
+    return {
+        "initialized": True,
+        "min_size": DB_POOL_MIN,
+        "max_size": DB_POOL_MAX,
+        "in_use": in_use,
+        "idle": idle,
+        **_stats,
+    }
@@ -0,0 +1,100 @@
+import os
+import asyncio
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import asyncpg
+from fastapi import HTTPException
+
+from backend.db import DATABASE_URL
+
+# --------------------------------------------------
+# Pool settings
+# --------------------------------------------------
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "2"))
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "10"))
+# Neon's "-pooler" endpoint is PgBouncer in transaction mode, which does not
+# keep prepared statements across transactions, so caching is off by default
+ASYNC_DB_STATEMENT_CACHE_SIZE = int(os.getenv("ASYNC_DB_STATEMENT_CACHE_SIZE", "0"))
+
+_pool = None
+
+
+def _asyncpg_dsn(url: str) -> str:
+    """
+    asyncpg forwards unknown URL parameters to the server as settings,
+    so drop libpq-only options such as channel_binding.
+    """
+    parts = urlsplit(url)
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query)
+        if k != "channel_binding"
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def init_async_pool():
+    global _pool
+
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL not set. Database is required.")
+
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            dsn=_asyncpg_dsn(DATABASE_URL),
+            min_size=ASYNC_DB_POOL_MIN,
+            max_size=ASYNC_DB_POOL_MAX,
+            statement_cache_size=ASYNC_DB_STATEMENT_CACHE_SIZE,
+        )
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_async_pool():
+    """
+    FastAPI dependency that returns the shared asyncpg pool.
+    """
+    if _pool is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return _pool
+
+
+async def fetch_all(pool, sql: str, *args) -> list:
+    """
+    Run one query on its own pooled connection and return plain dicts.
+    Each call borrows a separate connection, so several of them can be
+    awaited together with asyncio.gather.
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(sql, *args)
+    return [dict(r) for r in rows]
+
+
+async def fetch_many(pool, *queries) -> list:
+    """
+    Run independent queries concurrently. Each query is either a SQL
+    string or a (sql, *args) tuple; results come back in the same order.
+    """
+    return await asyncio.gather(*(
+        fetch_all(pool, q) if isinstance(q, str) else fetch_all(pool, *q)
+        for q in queries
+    ))
+
+
+def async_pool_stats() -> dict:
+    if _pool is None:
+        return {"initialized": False}
+
+    return {
+        "initialized": True,
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+    }
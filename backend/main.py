@@ -1,8 +1,38 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routers import companies, leaderboard, search, trends, chat
+from backend.db import init_pool, close_pool
+from backend.db_async import init_async_pool, close_async_pool
+from backend.rag.retriever import FAISS_ENABLED, retrieval_service
+from backend.rag.ollama_client import ollama
+from backend.routers import companies, leaderboard, search, trends, chat, metrics, export
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open (and pre-warm) the DB pool before the first request
+    await run_in_threadpool(init_pool)
+    await init_async_pool()
+    # One keep-alive connection pool to Ollama for every chat
+    await ollama.start()
+
+    if FAISS_ENABLED:
+        # Load model + index once instead of on every chat
+        try:
+            await run_in_threadpool(retrieval_service.load)
+        except Exception:
+            logging.exception("Retrieval service failed to load; chat runs without RAG context")
+
+    yield
+    await ollama.close()
+    await close_async_pool()
+    await run_in_threadpool(close_pool)
+
 
-app = FastAPI(title="YC Intel Advanced", version="0.1.0")
+app = FastAPI(title="YC Intel Advanced", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,6 +40,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # ✅ ALL APIs under /api
@@ -18,6 +49,8 @@ app.include_router(search.router, prefix="/api/search", tags=["Search"])
 app.include_router(trends.router,)
 app.include_router(leaderboard.router, prefix="/api", )
 app.include_router(companies.router,)
+app.include_router(export.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,42 @@
+import json
+import base64
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort: str, key: list) -> str:
+    """
+    Opaque cursor for keyset pagination: the sort it belongs to plus the
+    sort key of the last row on the page, e.g. ["Airbnb", 2].
+    """
+    payload = json.dumps({"s": sort, "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str, types: tuple) -> list:
+    """
+    Sort key from a cursor made by encode_cursor for `sort`. `types` is
+    the expected type of each key part, e.g. (str, int); anything else is
+    a 400 rather than a failed query.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        key = payload["k"]
+        if payload["s"] != sort or not isinstance(key, list) or len(key) != len(types):
+            raise ValueError
+        if not all(_is_type(value, t) for value, t in zip(key, types)):
+            raise ValueError
+        return key
+
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _is_type(value, expected) -> bool:
+    # bool is an int subclass but never a valid key; a real key may be
+    # written as a whole number
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
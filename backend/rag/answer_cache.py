@@ -0,0 +1,139 @@
+# backend/rag/answer_cache.py
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+# Cosine similarity above which two questions share an answer (> 1 disables)
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    "What's trending?!" and "whats  trending" map to the same key.
+    """
+    text = _PUNCTUATION.sub("", question.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of chat answers.
+
+    Lookups try the normalized question first, then the closest stored
+    question embedding. Entries belong to a version (data version plus
+    index version); when it changes the whole cache is dropped.
+    """
+
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl_s=ANSWER_CACHE_TTL_S, similarity=ANSWER_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.similarity = similarity
+
+        # normalized question -> (result, unit vector or None, stored_at)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+        self._counts = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+        }
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._items:
+                self._counts["invalidations"] += 1
+            self._items.clear()
+            self._version = version
+
+    def _expire(self, now):
+        stale = [k for k, (_, _, stored_at) in self._items.items() if now - stored_at > self.ttl_s]
+        for key in stale:
+            del self._items[key]
+        self._counts["expired"] += len(stale)
+
+    def _nearest(self, vector):
+        keys = [k for k, (_, v, _) in self._items.items() if v is not None]
+        if not keys:
+            return None
+
+        matrix = np.stack([self._items[k][1] for k in keys])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity else None
+
+    def get(self, question: str, version, vector=None):
+        key = normalize_question(question)
+
+        with self._lock:
+            self._check_version(version)
+            self._expire(time.monotonic())
+
+            if key in self._items:
+                self._items.move_to_end(key)
+                self._counts["exact_hits"] += 1
+                return self._items[key][0]
+
+            if vector is not None:
+                match = self._nearest(_unit(vector))
+                if match is not None:
+                    self._items.move_to_end(match)
+                    self._counts["semantic_hits"] += 1
+                    return self._items[match][0]
+
+            self._counts["misses"] += 1
+            return None
+
+    def put(self, question: str, version, result, vector=None):
+        key = normalize_question(question)
+        unit = _unit(vector) if vector is not None else None
+
+        with self._lock:
+            self._check_version(version)
+            self._items[key] = (result, unit, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> dict:
+        lookups = sum(self._counts[k] for k in ("exact_hits", "semantic_hits", "misses"))
+        hits = self._counts["exact_hits"] + self._counts["semantic_hits"]
+        return {
+            "entries": len(self._items),
+            "max_entries": self.max_size,
+            "ttl_s": self.ttl_s,
+            "similarity": self.similarity,
+            "version": self._version,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            **self._counts,
+        }
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype="float32")
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache()
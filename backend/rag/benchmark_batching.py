@@ -0,0 +1,93 @@
+"""
+Load test for query embedding: one encode call per request versus the
+micro-batching queue, with N concurrent clients.
+
+    python backend/rag/benchmark_batching.py --clients 32 --requests 20 --windows 2 5 10
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from sentence_transformers import SentenceTransformer
+
+# ------------------ FIX IMPORT PATH ------------------
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from backend.rag.retriever import EMBED_MODEL
+from backend.rag.embedding_batcher import EmbeddingBatcher
+
+QUESTIONS = [
+    "top fintech companies",
+    "what's trending in AI infrastructure",
+    "developer tools startups in San Francisco",
+    "healthcare companies from the W21 batch",
+    "climate tech with high momentum",
+    "B2B SaaS for logistics",
+    "consumer social apps",
+    "robotics startups hiring",
+]
+
+
+def run_load(encode_one, clients, requests_per_client):
+    latencies = []
+
+    def client(worker_id):
+        for i in range(requests_per_client):
+            question = QUESTIONS[(worker_id + i) % len(QUESTIONS)]
+            t0 = time.perf_counter()
+            encode_one(question)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+def report(label, result):
+    print(
+        f"{label:<24} {result['qps']:>8.1f} q/s  "
+        f"p50={result['p50_ms']:7.1f}ms  p95={result['p95_ms']:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--windows", type=float, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBED_MODEL)
+    model.encode(QUESTIONS)  # warm-up
+
+    print(f"{args.clients} clients x {args.requests} requests")
+
+    report("per-request encode", run_load(
+        lambda q: model.encode([q]), args.clients, args.requests
+    ))
+
+    for window_ms in args.windows:
+        batcher = EmbeddingBatcher(model.encode, max_batch=args.max_batch, window_ms=window_ms)
+        result = run_load(batcher.encode, args.clients, args.requests)
+        batcher.close()
+
+        stats = batcher.stats()
+        report(f"batched ({window_ms:g}ms)", result)
+        print(f"{'':<24} avg batch size {stats['avg_batch_size']}")
+
+
+if __name__ == "__main__":
+    main()
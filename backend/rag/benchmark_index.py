@@ -0,0 +1,139 @@
+"""
+Recall / latency / memory benchmark for the index types in index_factory,
+including the quantized storage modes with and without exact re-ranking.
+
+Uses the cached company embeddings when available (padded with jittered
+copies to reach larger corpus sizes), otherwise random unit vectors.
+
+    python backend/rag/benchmark_index.py --sizes 5000 20000 100000 --k 5
+    python backend/rag/benchmark_index.py --types flat sq_fp16 sq8 pq --refine
+"""
+import os
+import sys
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+# ------------------ FIX IMPORT PATH ------------------
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from backend.rag.embedding_cache import EmbeddingCache
+from backend.rag.index_factory import (
+    INDEX_TYPES,
+    QUANTIZED_TYPES,
+    build_index,
+    resolve_params,
+    apply_search_params,
+)
+
+
+def load_base_vectors(dim):
+    cache = EmbeddingCache()
+    if len(cache):
+        return np.array(cache.vectors, dtype="float32")
+
+    print("No embedding cache found; using random vectors")
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((5000, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_corpus(base, size, rng):
+    """
+    Grow the real corpus to `size` vectors by adding noisy copies, so the
+    neighbourhood structure stays close to real company embeddings.
+    """
+    picks = rng.integers(0, len(base), size)
+    noise = rng.standard_normal((size, base.shape[1])).astype("float32") * 0.05
+    corpus = base[picks] + noise
+    corpus[:min(size, len(base))] = base[:size]
+    return corpus
+
+
+def measure(index, queries, k):
+    latencies = []
+    results = []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def variants(types, refine):
+    """
+    (label, kind, overrides) per benchmarked mode; flat always runs first
+    as the exact baseline.
+    """
+    yield "flat", "flat", {}
+    for kind in types:
+        if kind == "flat":
+            continue
+        yield kind, kind, {}
+        if refine and kind in QUANTIZED_TYPES:
+            yield f"{kind}+refine", kind, {"refine": True}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 100000])
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--refine", action="store_true", help="also run quantized types with exact re-ranking")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    base = load_base_vectors(args.dim)
+
+    print(
+        f"{'size':>8} {'mode':<16} {'build_s':>8} {'recall@k':>9} "
+        f"{'p50_ms':>8} {'p99_ms':>8} {'mem_MB':>8} {'B/vec':>7}"
+    )
+
+    for size in args.sizes:
+        corpus = make_corpus(base, size, rng)
+        ids = np.arange(size, dtype="int64")
+        picks = rng.integers(0, len(base), args.queries)
+        queries = base[picks] + rng.standard_normal((args.queries, base.shape[1])).astype("float32") * 0.1
+
+        truth = None
+        for label, kind, overrides in variants(args.types, args.refine):
+            params = resolve_params(kind, overrides, n_vectors=size)
+
+            t0 = time.perf_counter()
+            index = build_index(kind, corpus.shape[1], params, train_vectors=corpus)
+            index.add_with_ids(corpus, ids)
+            build_s = time.perf_counter() - t0
+
+            apply_search_params(index, {"type": kind, "params": params})
+
+            found, latencies = measure(index, queries, args.k)
+            if truth is None:
+                truth = found  # exact flat search is the baseline
+
+            memory_bytes = faiss.serialize_index(index).nbytes
+
+            if kind in args.types:
+                print(
+                    f"{size:>8} {label:<16} {build_s:>8.2f} "
+                    f"{recall_at_k(found, truth):>9.3f} "
+                    f"{np.percentile(latencies, 50):>8.3f} "
+                    f"{np.percentile(latencies, 99):>8.3f} "
+                    f"{memory_bytes / 1e6:>8.1f} "
+                    f"{memory_bytes / size:>7.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
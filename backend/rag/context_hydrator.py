@@ -0,0 +1,168 @@
+# backend/rag/context_hydrator.py
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from psycopg2.extras import RealDictCursor
+
+from backend.db import db_connection
+from backend.timing import LatencyWindow
+
+# Prompt budget for retrieved companies; tokens estimated at ~4 chars each
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "1500"))
+CHARS_PER_TOKEN = 4
+# Don't bother with a truncated description shorter than this many tokens
+MIN_PARTIAL_TOKENS = 40
+
+HYDRATE_CACHE_SIZE = int(os.getenv("HYDRATE_CACHE_SIZE", "5000"))
+# Scores change without a new snapshot, so entries also age out
+HYDRATE_CACHE_TTL_S = float(os.getenv("HYDRATE_CACHE_TTL_S", "600"))
+
+HYDRATE_SQL = """
+    SELECT
+        c.id AS company_id,
+        c.name,
+        cl.batch,
+        cl.stage,
+        cl.location,
+        cl.tags,
+        cl.description,
+        cl.snapshot_hash,
+        cs.momentum_score,
+        cs.stability_score
+    FROM companies c
+    JOIN company_latest cl ON cl.company_id = c.id
+    LEFT JOIN company_scores cs ON cs.company_id = c.id
+    WHERE c.id = ANY(%s)
+"""
+
+
+class ContextHydrator:
+    """
+    Turns retrieval hits ({company_id, name, snapshot_hash}) into prompt
+    context. Details come from a read-through LRU keyed by
+    (company_id, snapshot_hash); all misses are fetched in one query.
+    """
+
+    def __init__(self, max_size=HYDRATE_CACHE_SIZE, ttl_s=HYDRATE_CACHE_TTL_S):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.latency = LatencyWindow()
+        self._counts = {"hits": 0, "misses": 0, "queries": 0}
+
+    def _get(self, key, now):
+        item = self._items.get(key)
+        if item is None or now - item[1] > self.ttl_s:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def _put(self, key, row, now):
+        self._items[key] = (row, now)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def hydrate(self, hits) -> list:
+        """
+        Company detail rows for `hits`, in hit order. Companies missing
+        from the database are dropped.
+        """
+        t0 = time.perf_counter()
+        now = time.monotonic()
+
+        rows = {}
+        missing = []
+        with self._lock:
+            for hit in hits:
+                row = self._get((hit["company_id"], hit.get("snapshot_hash")), now)
+                if row is None:
+                    missing.append(hit)
+                else:
+                    rows[hit["company_id"]] = row
+
+        self._counts["hits"] += len(rows)
+        self._counts["misses"] += len(missing)
+
+        if missing:
+            self._counts["queries"] += 1
+            with db_connection() as db:
+                cur = db.cursor(cursor_factory=RealDictCursor)
+                try:
+                    cur.execute(HYDRATE_SQL, ([h["company_id"] for h in missing],))
+                    fetched = {r["company_id"]: dict(r) for r in cur.fetchall()}
+                finally:
+                    cur.close()
+
+            with self._lock:
+                for hit in missing:
+                    row = fetched.get(hit["company_id"])
+                    if row is not None:
+                        rows[hit["company_id"]] = row
+                        self._put((hit["company_id"], hit.get("snapshot_hash")), row, now)
+
+        self.latency.add((time.perf_counter() - t0) * 1000)
+        return [rows[h["company_id"]] for h in hits if h["company_id"] in rows]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._items),
+            "max_entries": self.max_size,
+            "token_budget": RAG_CONTEXT_TOKENS,
+            "hydrate": self.latency.summary(),
+            **self._counts,
+        }
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _format_company(row) -> tuple:
+    """
+    (header, description) for one company; the description is the part
+    that gets truncated when the budget runs short.
+    """
+    parts = [f"YC {row['batch']}" if row["batch"] else None, row["stage"], row["location"]]
+    facts = ", ".join(p for p in parts if p)
+    lines = [f"{row['name']} ({facts})" if facts else row["name"]]
+
+    if row["tags"]:
+        lines.append("Tags: " + ", ".join(str(t) for t in row["tags"]))
+    if row["momentum_score"] is not None or row["stability_score"] is not None:
+        lines.append(f"Momentum: {row['momentum_score']}, Stability: {row['stability_score']}")
+
+    return "\n".join(lines), row["description"] or ""
+
+
+def pack_context(rows, token_budget=RAG_CONTEXT_TOKENS) -> str:
+    """
+    Render companies in rank order until the token budget is spent; the
+    last one that doesn't fit gets a shortened description.
+    """
+    blocks = []
+    remaining = token_budget
+
+    for row in rows:
+        header, description = _format_company(row)
+        block = f"{header}\n{description}".strip()
+        cost = _estimate_tokens(block) + 1
+
+        if cost <= remaining:
+            blocks.append(block)
+            remaining -= cost
+            continue
+
+        room = remaining - _estimate_tokens(header) - 2
+        if room >= MIN_PARTIAL_TOKENS:
+            blocks.append(f"{header}\n{description[:room * CHARS_PER_TOKEN].rstrip()}…")
+        break
+
+    return "\n\n".join(blocks)
+
+
+context_hydrator = ContextHydrator()
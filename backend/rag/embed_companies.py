@@ -1,6 +1,10 @@
 import sys
 import os
 import json
+import time
+import uuid
+import shutil
+import argparse
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
@@ -9,67 +13,456 @@ from sentence_transformers import SentenceTransformer
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.insert(0, PROJECT_ROOT)
 
-from backend.db import get_db
-
-# ------------------ CONFIG ------------------
-INDEX_PATH = "backend/rag/vector_store.faiss"
-META_PATH = "backend/rag/metadata.json"
-
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-def main():
-    db = get_db()
-    cur = db.cursor()
-
-    # ✅ IMPORTANT: use ONLY latest snapshot per company
-    cur.execute("""
-        SELECT DISTINCT ON (c.id)
-            c.id,
-            c.name,
-            cs.description,
-            cs.location,
-            cs.tags
-        FROM companies c
-        JOIN company_snapshots cs ON cs.company_id = c.id
-        WHERE cs.description IS NOT NULL
-        ORDER BY c.id, cs.scraped_at DESC
-    """)
-
-    rows = cur.fetchall()
-
-    texts = []
-    metadata = []
-
-    for r in rows:
-        text = f"""
-Company: {r[1]}
-Location: {r[3]}
-Tags: {r[4]}
-Description: {r[2]}
+from backend.db import db_connection
+from backend.rag.retriever import INDEX_PATH, META_PATH, EMBED_MODEL
+from backend.rag.metadata_store import MetadataStore, convert_legacy_json, write_metadata
+from backend.rag.embedding_cache import (
+    EMBED_CACHE_PATH,
+    EmbeddingCache,
+    EmbeddingCacheWriter,
+    load_hashes,
+)
+from backend.rag.index_factory import (
+    INDEX_TYPES,
+    NEEDS_TRAINING,
+    supports_remove,
+    build_index,
+    resolve_params,
+    load_index_params,
+    save_index_params,
+)
+
+# Rows fetched, encoded and added per step; peak memory is bounded by this
+EMBED_CHUNK_SIZE = int(os.getenv("RAG_EMBED_CHUNK_SIZE", "512"))
+# Progress is persisted every N chunks so an interrupted build can resume
+EMBED_CHECKPOINT_EVERY = int(os.getenv("RAG_EMBED_CHECKPOINT_EVERY", "8"))
+# Vectors used to train IVF / PQ quantizers on a full build
+EMBED_TRAIN_SAMPLE = int(os.getenv("RAG_EMBED_TRAIN_SAMPLE", "50000"))
+
+# In-progress build: partial index, metadata, new embedding cache, state.json
+BUILD_DIR = INDEX_PATH + ".build"
+STATE_PATH = os.path.join(BUILD_DIR, "state.json")
+
+model = SentenceTransformer(EMBED_MODEL)
+
+# ✅ IMPORTANT: use ONLY latest snapshot per company
+LATEST_SQL = """
+    SELECT
+        c.id,
+        c.name,
+        cs.snapshot_hash,
+        cs.description,
+        cs.location,
+        cs.tags
+    FROM companies c
+    JOIN company_latest cs ON cs.company_id = c.id
+    WHERE cs.description IS NOT NULL
+      AND c.id > %s
+    ORDER BY c.id
+"""
+
+LATEST_KEYS_SQL = """
+    SELECT c.id, c.name, cs.snapshot_hash
+    FROM companies c
+    JOIN company_latest cs ON cs.company_id = c.id
+    WHERE cs.description IS NOT NULL
+      AND c.id > %s
+    ORDER BY c.id
 """
-        texts.append(text.strip())
-        metadata.append({
-            "company_id": r[0],
-            "name": r[1]
-        })
 
-    print(f"Embedding {len(texts)} companies...")
 
-    embeddings = model.encode(texts, show_progress_bar=True)
-    embeddings = np.array(embeddings).astype("float32")
+def company_text(name, location, tags, description):
+    return f"""
+Company: {name}
+Location: {location}
+Tags: {tags}
+Description: {description}
+""".strip()
+
+
+def write_index_files(index, metadata, kind, params):
+    """
+    Replace the index, its build parameters and metadata atomically. The
+    index goes last: the running API reloads when the index file changes,
+    and by then the matching side files are already in place.
+    """
+    write_metadata(META_PATH, metadata)
+
+    save_index_params(INDEX_PATH, kind, params, index.d)
+
+    tmp_index = INDEX_PATH + ".tmp"
+    faiss.write_index(index, tmp_index)
+    os.replace(tmp_index, INDEX_PATH)
+
+
+def load_existing_index():
+    """
+    Returns (index, {company_id: metadata}) for an ID-mapped index built
+    by a previous run, or (None, {}) when a full build is needed.
+    """
+    if not (os.path.exists(INDEX_PATH) and convert_legacy_json(META_PATH)):
+        return None, {}
+
+    index = faiss.read_index(INDEX_PATH)
+    if not isinstance(index, faiss.IndexIDMap2):
+        # Position-based index from before incremental builds
+        return None, {}
+
+    return index, {m["company_id"]: m for m in MetadataStore(META_PATH)}
+
+
+def iter_chunks(sql, after_id=0, size=EMBED_CHUNK_SIZE):
+    """
+    Yield lists of rows from a named (server-side) cursor, so only one
+    chunk is held in memory at a time.
+    """
+    with db_connection() as db:
+        cur = db.cursor(name=f"embed_{uuid.uuid4().hex}")
+
+        try:
+            cur.execute(sql, (after_id,))
+            while True:
+                rows = cur.fetchmany(size)
+                if not rows:
+                    break
+                yield rows
+
+        finally:
+            cur.close()
+
+
+def plan_changes(metadata):
+    """
+    Cheap first pass over (id, name, snapshot_hash): how much work the
+    build has and whether any indexed vector has to be removed.
+    """
+    plan = {"total": 0, "to_embed": 0, "replaced": 0, "renamed": 0, "kept": 0}
+
+    for rows in iter_chunks(LATEST_KEYS_SQL):
+        for cid, name, snapshot_hash in rows:
+            plan["total"] += 1
+            known = metadata.get(cid)
+            if known is not None:
+                plan["kept"] += 1
+
+            if known is None or known["snapshot_hash"] != snapshot_hash:
+                plan["to_embed"] += 1
+                plan["replaced"] += known is not None
+            elif known["name"] != name:
+                plan["renamed"] += 1
+
+    plan["removed"] = len(metadata) - plan["kept"]
+    return plan
+
+
+class IndexBuild:
+    """
+    One streaming pass over company_latest in id order.
+
+    Each chunk is diffed against the indexed metadata, encoded (cache
+    misses only) and added to the index, so memory stays bounded by the
+    chunk size rather than the corpus. checkpoint() persists everything
+    needed to continue after the last processed company id.
+    """
+
+    def __init__(self, kind, params, index, metadata, full, overrides,
+                 train_target=0, last_id=0, seq=0, cache_hashes=(), started_at=None):
+        self.kind = kind
+        self.params = params
+        self.index = index
+        self.metadata = metadata
+        self.full = full
+        self.overrides = overrides or {}
+        self.train_target = train_target
+        self.last_id = last_id
+        self.seq = seq
+        self.started_at = started_at or time.time()
+
+        # Indexed ids, to find companies that disappeared between chunks
+        self.existing_ids = np.array(sorted(metadata), dtype="int64")
+        # (ids, vectors) held until an IVF / PQ quantizer is trained
+        self.pending = []
+        self.chunks = 0
+        self.encoded = 0
+
+        os.makedirs(BUILD_DIR, exist_ok=True)
+        self.old_cache = EmbeddingCache()
+        self.new_cache = EmbeddingCacheWriter(
+            os.path.join(BUILD_DIR, "cache.f32"),
+            model.get_sentence_embedding_dimension(),
+            cache_hashes,
+        )
+
+    # ------------------ START / RESUME ------------------
+
+    @classmethod
+    def start(cls, kind, full, spec, overrides):
+        index, metadata = (None, {}) if full else load_existing_index()
+        plan = plan_changes(metadata)
+
+        print(
+            f"{plan['total']} companies: {plan['to_embed']} to (re)index, "
+            f"{plan['removed']} removed, {plan['total'] - plan['to_embed']} unchanged"
+        )
+
+        if index is not None and (plan["replaced"] or plan["removed"]) and not supports_remove(kind, spec["params"]):
+            print(f"{kind} index cannot remove vectors; rebuilding from scratch")
+            index, metadata, full = None, {}, True
+
+        elif index is not None and not (plan["to_embed"] or plan["removed"] or plan["renamed"]):
+            return None
+
+        train_target = min(plan["total"], EMBED_TRAIN_SAMPLE)
+        if index is None:
+            params = resolve_params(
+                kind,
+                overrides or (spec["params"] if kind == spec["type"] else None),
+                train_target
+            )
+        else:
+            params = spec["params"]
+
+        return cls(kind, params, index, metadata, full, overrides, train_target=train_target)
+
+    @classmethod
+    def resume(cls, kind, full, overrides):
+        """
+        Continue the build in BUILD_DIR if it was started with the same
+        settings; None when there is nothing to resume.
+        """
+        try:
+            with open(STATE_PATH, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if state["kind"] != kind or state["overrides"] != (overrides or {}) or (full and not state["full"]):
+            print("Discarding checkpoint from a build with different settings")
+            return None
+
+        seq = state["seq"]
+        index = faiss.read_index(_build_path("index", seq))
+        metadata = {m["company_id"]: m for m in MetadataStore(_build_path("metadata", seq))}
+        hashes = load_hashes(_build_path("cache_hashes", seq))[:state["cache_rows"]]
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
+        print(f"Resuming {kind} build after company id {state['last_company_id']}")
+        return cls(
+            kind, state["params"], index, metadata, state["full"], overrides,
+            last_id=state["last_company_id"], seq=seq, cache_hashes=hashes,
+            started_at=state["started_at"],
+        )
 
-    faiss.write_index(index, INDEX_PATH)
+    # ------------------ CHUNKS ------------------
 
-    with open(META_PATH, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    def add_chunk(self, rows):
+        ids = [r[0] for r in rows]
+        in_chunk = set(ids)
 
-    cur.close()
-    db.close()
+        # Indexed companies in (last_id, chunk end] that no longer have a row
+        lo, hi = np.searchsorted(self.existing_ids, [self.last_id, ids[-1]], side="right")
+        gone = [int(cid) for cid in self.existing_ids[lo:hi] if int(cid) not in in_chunk]
+
+        changed = [
+            r for r in rows
+            if r[0] not in self.metadata or self.metadata[r[0]]["snapshot_hash"] != r[2]
+        ]
+
+        # Changed companies are removed and re-added under the same id
+        stale = gone + [r[0] for r in changed if r[0] in self.metadata]
+        if stale:
+            if not supports_remove(self.kind, self.params):
+                raise RuntimeError(
+                    f"{self.kind} index cannot remove vectors; rerun with --no-resume --full"
+                )
+            self.index.remove_ids(np.array(stale, dtype="int64"))
+        for cid in gone:
+            del self.metadata[cid]
+
+        fresh = self._vectors(changed)
+        if changed:
+            self._add(np.array([r[0] for r in changed], dtype="int64"), fresh)
+
+        fresh_by_id = {r[0]: v for r, v in zip(changed, fresh)}
+        for r in rows:
+            self.metadata[r[0]] = {"company_id": r[0], "name": r[1], "snapshot_hash": r[2]}
+
+            # Carry every current snapshot's vector into the new cache
+            vector = fresh_by_id.get(r[0])
+            if vector is None and r[2]:
+                vector = self.old_cache.get(r[2])
+            if vector is not None and r[2]:
+                self.new_cache.add(r[2], vector)
+
+        self.last_id = ids[-1]
+        self.chunks += 1
+
+    def _vectors(self, rows):
+        """
+        float32 vectors for `rows`; only snapshots never seen before need
+        the model.
+        """
+        vectors = [self.old_cache.get(r[2]) if r[2] else None for r in rows]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+
+        if missing:
+            encoded = model.encode(
+                [company_text(rows[i][1], rows[i][4], rows[i][5], rows[i][3]) for i in missing]
+            )
+            for i, vector in zip(missing, np.asarray(encoded, dtype="float32")):
+                vectors[i] = vector
+            self.encoded += len(missing)
+
+        if not rows:
+            return np.zeros((0, self.new_cache.dim), dtype="float32")
+        return np.stack(vectors).astype("float32")
+
+    def _add(self, ids, vectors):
+        if self.index is not None:
+            self.index.add_with_ids(vectors, ids)
+            return
+
+        self.pending.append((ids, vectors))
+        buffered = sum(len(i) for i, _ in self.pending)
+        if self.kind not in NEEDS_TRAINING or buffered >= self.train_target:
+            self._build_from_pending()
+
+    def _build_from_pending(self):
+        ids = np.concatenate([i for i, _ in self.pending])
+        vectors = np.concatenate([v for _, v in self.pending])
+        self.pending = []
+
+        print(f"Building {self.kind} index {self.params}")
+        self.index = build_index(self.kind, vectors.shape[1], self.params, train_vectors=vectors)
+        self.index.add_with_ids(vectors, ids)
+
+    # ------------------ CHECKPOINT / FINISH ------------------
+
+    def checkpoint(self):
+        if self.index is None:
+            # Still collecting the training sample; nothing durable yet
+            return
+
+        seq = self.seq + 1
+        faiss.write_index(self.index, _build_path("index", seq))
+        write_metadata(_build_path("metadata", seq), self.metadata.values())
+        self.new_cache.flush(_build_path("cache_hashes", seq))
+
+        # state.json is the commit point: it names the files of this seq
+        state = {
+            "kind": self.kind,
+            "params": self.params,
+            "overrides": self.overrides,
+            "full": self.full,
+            "seq": seq,
+            "last_company_id": self.last_id,
+            "cache_rows": len(self.new_cache),
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+        }
+        tmp_path = STATE_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, STATE_PATH)
+
+        if self.seq:
+            for name in ("index", "metadata", "cache_hashes"):
+                _remove(_build_path(name, self.seq))
+        self.seq = seq
+
+    def finish(self):
+        if self.index is None:
+            if not self.pending:
+                print("No companies with descriptions to index")
+                return
+            self._build_from_pending()
+
+        # Indexed companies after the last row no longer exist
+        lo = np.searchsorted(self.existing_ids, self.last_id, side="right")
+        tail = [int(cid) for cid in self.existing_ids[lo:] if int(cid) in self.metadata]
+        if tail:
+            self.index.remove_ids(np.array(tail, dtype="int64"))
+            for cid in tail:
+                del self.metadata[cid]
+
+        write_index_files(self.index, list(self.metadata.values()), self.kind, self.params)
+
+        # The new cache only holds snapshots that are still current. Unmap
+        # the old one first; Windows can't rename over a mapped file.
+        self.old_cache = None
+        self.new_cache.commit(EMBED_CACHE_PATH)
+
+        shutil.rmtree(BUILD_DIR, ignore_errors=True)
+
+
+def _build_path(name, seq):
+    ext = {"index": "faiss", "metadata": "bin", "cache_hashes": "npy"}[name]
+    return os.path.join(BUILD_DIR, f"{name}.{seq}.{ext}")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def main(full=False, index_type=None, param_overrides=None, resume=True, chunk_size=EMBED_CHUNK_SIZE):
+    start = time.time()
+
+    spec = load_index_params(INDEX_PATH)
+    kind = index_type or os.getenv("RAG_INDEX_TYPE") or spec["type"]
+
+    # A different index type or new build parameters mean a fresh build
+    full = full or kind != spec["type"] or bool(param_overrides)
+
+    build = IndexBuild.resume(kind, full, param_overrides) if resume else None
+    if build is None:
+        shutil.rmtree(BUILD_DIR, ignore_errors=True)
+        build = IndexBuild.start(kind, full, spec, param_overrides)
+
+    if build is None:
+        print("✅ Index already up to date")
+        return
+
+    for rows in iter_chunks(LATEST_SQL, build.last_id, chunk_size):
+        build.add_chunk(rows)
+        if build.chunks % EMBED_CHECKPOINT_EVERY == 0:
+            build.checkpoint()
+            print(f"  ... through company id {build.last_id} ({build.encoded} encoded)")
+
+    build.finish()
+
+    if build.index is not None:
+        print(
+            f"✅ {kind} index has {build.index.ntotal} companies, "
+            f"{build.encoded} encoded ({time.time() - start:.1f}s)"
+        )
+
+
+def parse_param(value):
+    key, _, raw = value.partition("=")
+    try:
+        return key, json.loads(raw)
+    except json.JSONDecodeError:
+        return key, raw
 
-    print(f"✅ Embedded {len(texts)} companies successfully")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="ignore the existing index and rebuild")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="defaults to RAG_INDEX_TYPE or the current index")
+    parser.add_argument(
+        "--param", action="append", default=[], type=parse_param,
+        help="build parameter override, e.g. --param nlist=128 --param m=32"
+    )
+    parser.add_argument("--chunk-size", type=int, default=EMBED_CHUNK_SIZE, help="rows encoded per step")
+    parser.add_argument("--no-resume", action="store_true", help="discard an interrupted build's checkpoint")
+    args = parser.parse_args()
+
+    main(
+        full=args.full,
+        index_type=args.index_type,
+        param_overrides=dict(args.param),
+        resume=not args.no_resume,
+        chunk_size=args.chunk_size,
+    )
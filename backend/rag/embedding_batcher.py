@@ -0,0 +1,115 @@
+# backend/rag/embedding_batcher.py
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from backend.timing import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Questions arriving within this window share one encode call
+RAG_BATCH_WINDOW_MS = float(os.getenv("RAG_BATCH_WINDOW_MS", "5"))
+RAG_BATCH_MAX = int(os.getenv("RAG_BATCH_MAX", "32"))
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-question encodes into batched calls.
+
+    Callers block on a future; one worker thread collects
+    requests until RAG_BATCH_MAX are queued or RAG_BATCH_WINDOW_MS has
+    passed since the first one, then encodes them together.
+    """
+
+    def __init__(self, encode_batch, max_batch=RAG_BATCH_MAX, window_ms=RAG_BATCH_WINDOW_MS):
+        self.encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.window_s = window_ms / 1000
+
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+        self.batches = 0
+        self.items = 0
+        self.queue_wait = LatencyWindow()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, text: str):
+        return self.submit(text).result()
+
+    def close(self):
+        self._stopped = True
+        self._queue.put(None)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.window_s
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                self._encode_next()
+            except Exception:
+                # One bad batch must not end the only worker thread
+                logger.exception("Embedding batcher failed; continuing")
+
+    def _encode_next(self):
+        # Claim each future; ones their caller already cancelled are dropped
+        batch = [item for item in self._collect() if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.add((started - enqueued) * 1000)
+
+        try:
+            vectors = self.encode_batch([text for text, _, _ in batch])
+        except Exception as e:
+            logger.exception("Batched encode failed")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future, _), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window_s * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "queue_wait": self.queue_wait.summary(),
+        }
@@ -0,0 +1,110 @@
+# backend/rag/embedding_cache.py
+import os
+
+import numpy as np
+
+from backend.rag.retriever import RAG_DIR
+from backend.rag.metadata_store import HASH_WIDTH
+
+# Vectors keyed by company_snapshots.snapshot_hash, reused across builds.
+# One file: raw float32 rows, then the parallel array of hashes, then a
+# footer. Vectors and hashes are replaced together, and the vectors can
+# be memory-mapped instead of loaded.
+EMBED_CACHE_PATH = os.getenv("RAG_EMBED_CACHE_PATH", os.path.join(RAG_DIR, "embedding_cache.f32"))
+
+# Footer: magic, row count, dimension
+CACHE_MAGIC = b"YCEMB001"
+FOOTER_SIZE = len(CACHE_MAGIC) + 16
+
+
+class EmbeddingCache:
+    """
+    Read-only view of a cache written by EmbeddingCacheWriter. A missing,
+    unfinished or older-format file reads as an empty cache.
+    """
+
+    def __init__(self, path=EMBED_CACHE_PATH):
+        self.path = path
+        self.vectors = None
+        self._rows = {}
+
+        if not os.path.exists(path) or os.path.getsize(path) < FOOTER_SIZE:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(-FOOTER_SIZE, os.SEEK_END)
+            footer = f.read(FOOTER_SIZE)
+        if footer[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            return
+
+        rows, dim = np.frombuffer(footer[len(CACHE_MAGIC):], dtype="<i8").tolist()
+        vector_bytes = rows * dim * 4
+        if not rows or os.path.getsize(path) != vector_bytes + rows * HASH_WIDTH + FOOTER_SIZE:
+            return
+
+        self.vectors = np.memmap(path, dtype="<f4", mode="r", shape=(rows, dim))
+        hashes = np.memmap(path, dtype=f"S{HASH_WIDTH}", mode="r", offset=vector_bytes, shape=(rows,))
+        self._rows = {h.decode("ascii"): i for i, h in enumerate(hashes.tolist())}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, snapshot_hash):
+        row = self._rows.get(snapshot_hash)
+        return None if row is None else np.array(self.vectors[row])
+
+
+class EmbeddingCacheWriter:
+    """
+    Appends (hash, vector) rows to a new cache file. flush() makes the
+    rows written so far durable; reopening with `rows` truncates anything
+    appended after that point, so a resumed build continues cleanly.
+    """
+
+    def __init__(self, path, dim, hashes=()):
+        self.path = path
+        self.dim = dim
+        self.hashes = list(hashes)
+
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        self._file = open(path, mode)
+        self._file.truncate(len(self.hashes) * dim * 4)
+        self._file.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, snapshot_hash, vector):
+        self._file.write(np.asarray(vector, dtype="<f4").tobytes())
+        self.hashes.append(snapshot_hash)
+
+    def flush(self, hashes_file=None):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if hashes_file:
+            save_hashes(hashes_file, self.hashes)
+
+    def commit(self, dest):
+        """
+        Append the hashes and footer, then move the file over `dest` in
+        one rename, so readers see either the old cache or the new one.
+        """
+        self._file.write(np.array(self.hashes, dtype=f"S{HASH_WIDTH}").tobytes())
+        self._file.write(CACHE_MAGIC + np.array([len(self.hashes), self.dim], dtype="<i8").tobytes())
+        self.flush()
+        self.close()
+        os.replace(self.path, dest)
+
+    def close(self):
+        self._file.close()
+
+
+def save_hashes(path, hashes):
+    # np.save appends .npy unless the name already ends with it
+    tmp_path = path[:-len(".npy")] + ".tmp.npy"
+    np.save(tmp_path, np.array(hashes, dtype=f"S{HASH_WIDTH}"))
+    os.replace(tmp_path, path)
+
+
+def load_hashes(path):
+    return [h.decode("ascii") for h in np.load(path).tolist()]
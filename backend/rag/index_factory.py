@@ -0,0 +1,158 @@
+# backend/rag/index_factory.py
+import os
+import json
+import math
+import time
+
+import faiss
+import numpy as np
+
+# Build-time defaults; anything here can be overridden per build
+DEFAULT_PARAMS = {
+    "flat": {},
+    # nlist 0 = pick from the corpus size at build time
+    "ivf_flat": {"nlist": 0, "nprobe": 8},
+    "ivf_pq": {"nlist": 0, "nprobe": 8, "m": 16, "nbits": 8, "refine": False, "k_factor": 4},
+    "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 64},
+    # Compressed storage, exhaustive search: 2, 1 and m bytes per vector.
+    # refine keeps float32 copies and re-ranks k * k_factor candidates.
+    "sq_fp16": {"refine": False, "k_factor": 4},
+    "sq8": {"refine": False, "k_factor": 4},
+    "pq": {"m": 16, "nbits": 8, "refine": False, "k_factor": 4},
+}
+
+INDEX_TYPES = tuple(DEFAULT_PARAMS)
+
+# HNSW graphs cannot delete vectors; those builds are redone from scratch
+SUPPORTS_REMOVE = {"flat", "ivf_flat", "ivf_pq", "sq_fp16", "sq8", "pq"}
+
+# Types whose quantizers are trained on a sample before vectors are added
+NEEDS_TRAINING = {"ivf_flat", "ivf_pq", "sq8", "pq"}
+
+QUANTIZED_TYPES = {"ivf_pq", "sq_fp16", "sq8", "pq"}
+
+
+def supports_remove(kind: str, params: dict) -> bool:
+    # The refine stage keeps its own vector store without id removal
+    return kind in SUPPORTS_REMOVE and not params.get("refine")
+
+
+def resolve_params(kind: str, overrides: dict = None, n_vectors: int = 0) -> dict:
+    if kind not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown index type {kind!r}; expected one of {INDEX_TYPES}")
+
+    params = {**DEFAULT_PARAMS[kind], **(overrides or {})}
+
+    if kind.startswith("ivf") and not params["nlist"]:
+        # ~4*sqrt(n) lists, but keep >= 39 training points per list
+        params["nlist"] = max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+    if kind in ("ivf_pq", "pq"):
+        # PQ needs at least 2**nbits training points per sub-quantizer
+        max_bits = int(math.log2(max(n_vectors, 2)))
+        params["nbits"] = max(1, min(params["nbits"], max_bits))
+
+    return params
+
+
+def build_index(kind: str, dim: int, params: dict, train_vectors=None):
+    """
+    Create an empty ID-mapped index of the given type, trained on
+    `train_vectors` when the type needs it. Vectors are added by the caller
+    with add_with_ids, using company ids as labels.
+    """
+    if kind == "flat":
+        base = faiss.IndexFlatL2(dim)
+
+    elif kind == "ivf_flat":
+        quantizer = faiss.IndexFlatL2(dim)
+        base = faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+
+    elif kind == "ivf_pq":
+        quantizer = faiss.IndexFlatL2(dim)
+        base = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["m"], params["nbits"])
+
+    elif kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, params["m"])
+        base.hnsw.efConstruction = params["ef_construction"]
+
+    elif kind == "sq_fp16":
+        base = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+
+    elif kind == "sq8":
+        base = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+
+    elif kind == "pq":
+        base = faiss.IndexPQ(dim, params["m"], params["nbits"])
+
+    else:
+        raise ValueError(f"Unknown index type {kind!r}")
+
+    if params.get("refine"):
+        # Candidates from the compressed codes are re-ranked exactly
+        base = faiss.IndexRefineFlat(base)
+
+    if not base.is_trained:
+        if train_vectors is None or len(train_vectors) == 0:
+            raise ValueError(f"{kind} index needs training vectors")
+        base.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+
+    return faiss.IndexIDMap2(base)
+
+
+def apply_search_params(index, spec: dict):
+    """
+    Apply query-time knobs (nprobe / efSearch / refine k_factor) from a
+    stored build spec. RAG_NPROBE, RAG_EF_SEARCH and RAG_REFINE_K_FACTOR
+    override the stored values.
+    """
+    params = spec.get("params", {})
+    nprobe = os.getenv("RAG_NPROBE") or params.get("nprobe")
+    ef_search = os.getenv("RAG_EF_SEARCH") or params.get("ef_search")
+    k_factor = os.getenv("RAG_REFINE_K_FACTOR") or params.get("k_factor")
+
+    # Search knobs live on the index inside the id map (and refine stage)
+    base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if isinstance(base, faiss.IndexRefine):
+        if k_factor:
+            base.k_factor = float(k_factor)
+        base = faiss.downcast_index(base.base_index)
+
+    ps = faiss.ParameterSpace()
+    if nprobe and spec["type"].startswith("ivf"):
+        ps.set_index_parameter(base, "nprobe", int(nprobe))
+    if ef_search and spec["type"] == "hnsw":
+        ps.set_index_parameter(base, "efSearch", int(ef_search))
+
+
+# ------------------ BUILD PARAMETERS SIDE-CAR ------------------
+
+def params_path(index_path: str) -> str:
+    return index_path + ".json"
+
+
+def save_index_params(index_path: str, kind: str, params: dict, dim: int):
+    spec = {
+        "type": kind,
+        "params": params,
+        "dim": dim,
+        "metric": "l2",
+        "built_at": time.time(),
+    }
+
+    tmp_path = params_path(index_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+    os.replace(tmp_path, params_path(index_path))
+
+
+def load_index_params(index_path: str) -> dict:
+    """
+    Returns the stored build spec, or a flat spec for indexes written
+    before the side-car existed.
+    """
+    try:
+        with open(params_path(index_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"type": "flat", "params": {}}
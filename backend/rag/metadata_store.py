@@ -0,0 +1,134 @@
+# backend/rag/metadata_store.py
+import os
+import json
+import struct
+import logging
+
+import numpy as np
+
+# ------------------ FILE LAYOUT ------------------
+#
+#   header      magic, format version, reserved, count, names length
+#   ids         int64[count]        company ids, ascending
+#   hashes      S64[count]          snapshot_hash (hex sha256)
+#   offsets     int64[count + 1]    byte offsets into names
+#   names       utf-8 bytes
+#
+# Every section is 8-byte aligned, so the arrays are views straight onto
+# the memory-mapped file: no parsing at startup, and worker processes
+# share the same OS page-cache pages.
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"YCMETA\0\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+HASH_WIDTH = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+
+def write_metadata(path: str, entries):
+    """
+    Write {company_id, name, snapshot_hash} entries atomically.
+    """
+    entries = sorted(entries, key=lambda m: m["company_id"])
+    count = len(entries)
+
+    ids = np.array([m["company_id"] for m in entries], dtype="<i8")
+    hashes = np.array([m["snapshot_hash"] or "" for m in entries], dtype=f"S{HASH_WIDTH}")
+    names = [m["name"].encode("utf-8") for m in entries]
+    offsets = np.zeros(count + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(n) for n in names])
+    blob = b"".join(names)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, len(blob)))
+        for section in (ids.tobytes(), hashes.tobytes(), offsets.tobytes()):
+            f.write(section)
+            f.write(b"\0" * (_aligned(len(section)) - len(section)))
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class MetadataStore:
+    """
+    Read-only, memory-mapped view of a metadata file written by
+    write_metadata. Lookups are a binary search over the mapped id array.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buf = np.memmap(path, dtype=np.uint8, mode="r")
+
+        magic, version, _, count, names_len = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a metadata store")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+
+        pos = HEADER.size
+        self.ids = np.frombuffer(self._buf, dtype="<i8", count=count, offset=pos)
+        pos += _aligned(self.ids.nbytes)
+        self.hashes = np.frombuffer(self._buf, dtype=f"S{HASH_WIDTH}", count=count, offset=pos)
+        pos += _aligned(self.hashes.nbytes)
+        self.offsets = np.frombuffer(self._buf, dtype="<i8", count=count + 1, offset=pos)
+        pos += _aligned(self.offsets.nbytes)
+        self.names = self._buf[pos:pos + names_len]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _position(self, company_id: int):
+        pos = int(np.searchsorted(self.ids, company_id))
+        if pos < len(self.ids) and self.ids[pos] == company_id:
+            return pos
+        return None
+
+    def _entry(self, pos: int) -> dict:
+        start, end = self.offsets[pos], self.offsets[pos + 1]
+        return {
+            "company_id": int(self.ids[pos]),
+            "name": self.names[start:end].tobytes().decode("utf-8"),
+            "snapshot_hash": self.hashes[pos].decode("ascii") or None,
+        }
+
+    def get(self, company_id: int):
+        pos = self._position(company_id)
+        return None if pos is None else self._entry(pos)
+
+    def __iter__(self):
+        for pos in range(len(self.ids)):
+            yield self._entry(pos)
+
+
+def convert_legacy_json(path: str) -> bool:
+    """
+    Write `path` from the metadata.json next to it, as left by builds
+    before this format existed. Only JSON that carries snapshot hashes
+    came with an id-labelled index the store can serve; older JSON (and
+    its position-labelled index) needs a rebuild with embed_companies.
+    Returns True when `path` exists afterwards.
+    """
+    if os.path.exists(path):
+        return True
+
+    legacy_path = os.path.join(os.path.dirname(path), "metadata.json")
+    if not os.path.exists(legacy_path):
+        return False
+
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    if any("snapshot_hash" not in m for m in entries):
+        logger.warning(
+            "%s predates id-labelled indexes; rebuild with embed_companies --full", legacy_path
+        )
+        return False
+
+    write_metadata(path, entries)
+    logger.info("Converted %s to %s (%d entries)", legacy_path, path, len(entries))
+    return True
@@ -1,22 +1,445 @@
 import os
-import requests
+import json
+import math
+import time
+import asyncio
+
+import httpx
+
+from backend.timing import LatencyWindow
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 
+# Streaming: no read timeout between tokens would hang forever on a stuck model
+OLLAMA_CONNECT_TIMEOUT_S = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_S", "5"))
+OLLAMA_READ_TIMEOUT_S = float(os.getenv("OLLAMA_READ_TIMEOUT_S", "120"))
+
+# Generations Ollama runs at once (match OLLAMA_NUM_PARALLEL on the server)
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+# Requests allowed to wait for a slot; beyond this we shed load with a 503
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "16"))
+OLLAMA_QUEUE_TIMEOUT_S = float(os.getenv("OLLAMA_QUEUE_TIMEOUT_S", "30"))
+# Retry-After used until there are generation timings to estimate from
+OLLAMA_RETRY_AFTER_S = int(os.getenv("OLLAMA_RETRY_AFTER_S", "5"))
+
+
+class LLMOverloaded(Exception):
+    """
+    Raised when the wait queue is full or a queued request waited too long.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Slot:
+    """
+    A reserved generation slot. release() is idempotent.
+    """
+
+    def __init__(self, semaphore):
+        self._semaphore = semaphore
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._semaphore.release()
+
+
+class _Broadcast:
+    """
+    One token stream fanned out to every subscriber. Tokens are kept, so
+    a late subscriber replays the answer from the start.
+
+    The shared task waits for the generation slot itself, so the wait is
+    cancelled, like the generation, only when the last subscriber leaves.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        # Set once a slot is held, or acquiring one failed (start_error)
+        self.started = asyncio.Event()
+        self.start_error = None
+        self.subscribers = 0
+        self.cancelled = False
+        self.task = None
+        self.cond = asyncio.Condition()
+
+    async def run(self, acquire, stream):
+        try:
+            slot = await acquire()
+        except Exception as e:
+            # Nothing sent yet: every subscriber raises it from open_stream
+            self.start_error = e
+            self.done = True
+            return
+        finally:
+            self.started.set()
+
+        await self.pump(stream(slot))
+
+    async def pump(self, source):
+        try:
+            async for token in source:
+                async with self.cond:
+                    self.tokens.append(token)
+                    self.cond.notify_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            await source.aclose()
+            async with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+
+class TokenStream:
+    """
+    A subscriber's view of a shared generation. aclose() is idempotent;
+    the generation is cancelled when its last subscriber leaves.
+    """
+
+    def __init__(self, broadcast: _Broadcast):
+        self._broadcast = broadcast
+        self._pos = 0
+        self._closed = False
+        broadcast.subscribers += 1
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        b = self._broadcast
+        async with b.cond:
+            await b.cond.wait_for(lambda: self._pos < len(b.tokens) or b.done)
+            if self._pos < len(b.tokens):
+                token = b.tokens[self._pos]
+                self._pos += 1
+                return token
+
+        if b.error is not None:
+            raise b.error
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        b = self._broadcast
+        b.subscribers -= 1
+        if b.subscribers == 0 and b.task is not None and not b.task.done():
+            b.cancelled = True
+            b.task.cancel()
+
+
+class _Flight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class OllamaClient:
+    """
+    Async Ollama client shared by all requests.
+
+    One httpx.AsyncClient keeps connections to Ollama alive between
+    calls. At most `max_concurrency` generations run at once; up to
+    `max_queue` more wait for a slot, and anything past that is rejected
+    with LLMOverloaded instead of piling up.
+
+    Identical prompts in flight at the same time share one generation
+    (single-flight): generate() callers await the same task and
+    open_stream() callers subscribe to the same token stream.
+    """
+
+    def __init__(
+        self,
+        base_url=OLLAMA_URL,
+        model=OLLAMA_MODEL,
+        max_concurrency=OLLAMA_MAX_CONCURRENCY,
+        max_queue=OLLAMA_MAX_QUEUE,
+        queue_timeout_s=OLLAMA_QUEUE_TIMEOUT_S,
+    ):
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        # Single-flight: normalized (model, prompt) -> shared work
+        self._flights = {}
+        self._streams = {}
+
+        self.queue_wait = LatencyWindow()
+        self.generation_latency = LatencyWindow()
+        self.ttft_latency = LatencyWindow()
+        self._counts = {
+            "requests": 0,
+            "rejected": 0,
+            "queue_timeouts": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "errors": 0,
+            "generations_saved": 0,
+        }
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT_S, connect=OLLAMA_CONNECT_TIMEOUT_S),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _retry_after(self) -> int:
+        """
+        Rough seconds until a slot frees up: the queue ahead of the caller
+        drained at the median generation time per slot.
+        """
+        p50_ms = self.generation_latency.summary().get("p50_ms")
+        if p50_ms is None:
+            return OLLAMA_RETRY_AFTER_S
+
+        rounds = (self.waiting + self.max_concurrency) / self.max_concurrency
+        return max(1, math.ceil(rounds * p50_ms / 1000))
+
+    async def acquire(self) -> Slot:
+        """
+        Wait for a generation slot, or raise LLMOverloaded.
+        """
+        self._counts["requests"] += 1
+
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._counts["rejected"] += 1
+            raise LLMOverloaded("LLM queue is full", self._retry_after())
+
+        self.waiting += 1
+        t0 = time.perf_counter()
+        try:
+            acquired = await self._wait_for_permit()
+        finally:
+            self.waiting -= 1
+            self.queue_wait.add((time.perf_counter() - t0) * 1000)
+
+        if not acquired:
+            self._counts["queue_timeouts"] += 1
+            raise LLMOverloaded("Timed out waiting for the LLM", self._retry_after())
+
+        return Slot(self._semaphore)
+
+    async def _wait_for_permit(self) -> bool:
+        """
+        Semaphore acquire with the queue timeout. Not asyncio.wait_for,
+        which can drop a permit acquired just as the timeout or a
+        cancellation lands, shrinking capacity for good.
+        """
+        acquiring = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            done, _ = await asyncio.wait({acquiring}, timeout=self.queue_timeout_s)
+        except BaseException:
+            self._abandon(acquiring)
+            raise
+
+        if done:
+            return True
+        self._abandon(acquiring)
+        return False
+
+    def _abandon(self, acquiring):
+        # Hand back the permit if the acquire won, now or later
+        if acquiring.done():
+            self._return_permit(acquiring)
+        else:
+            acquiring.cancel()
+            acquiring.add_done_callback(self._return_permit)
+
+    def _return_permit(self, acquiring):
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self._semaphore.release()
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+        }
+
+    def _key(self, prompt: str):
+        return self.model, " ".join(prompt.split())
+
+    def _forget(self, registry, key, value):
+        if registry.get(key) is value:
+            del registry[key]
+
+    async def generate(self, prompt: str) -> str:
+        """
+        Full answer for `prompt`, shared with identical in-flight calls.
+        The generation is cancelled only when every caller has gone.
+        """
+        key = self._key(prompt)
+        flight = self._flights.get(key)
+
+        if flight is None:
+            flight = _Flight(asyncio.create_task(self._generate(prompt)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._flights, key, flight))
+        else:
+            self._counts["generations_saved"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Unregister first so a caller arriving before the task
+                # winds down starts a fresh generation instead of joining
+                self._forget(self._flights, key, flight)
+                flight.task.cancel()
+
+    async def open_stream(self, prompt: str) -> TokenStream:
+        """
+        Subscribe to the token stream for `prompt`, joining an identical
+        generation already in flight when there is one. Returns once the
+        generation holds a slot; raises LLMOverloaded (to every subscriber
+        still waiting) before any response has started.
+        """
+        key = self._key(prompt)
+        broadcast = self._streams.get(key)
+
+        if broadcast is not None and not broadcast.done and not broadcast.cancelled:
+            self._counts["generations_saved"] += 1
+        else:
+            # Registered before the slot wait so concurrent twins join it
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(
+                broadcast.run(self.acquire, lambda slot: self.stream(prompt, slot=slot))
+            )
+            broadcast.task.add_done_callback(lambda _: self._forget(self._streams, key, broadcast))
+
+        subscription = TokenStream(broadcast)
+        try:
+            await broadcast.started.wait()
+        except asyncio.CancelledError:
+            # Leaving only cancels the shared wait if nobody else is on it
+            await subscription.aclose()
+            raise
+
+        if broadcast.start_error is not None:
+            await subscription.aclose()
+            raise broadcast.start_error
+
+        return subscription
+
+    async def _generate(self, prompt: str) -> str:
+        slot = await self.acquire()
+        self.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            response = await self._client.post("/api/generate", json=self._payload(prompt, False))
+            response.raise_for_status()
+            answer = response.json()["response"]
+        except asyncio.CancelledError:
+            self._counts["cancelled"] += 1
+            raise
+        except Exception:
+            self._counts["errors"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            slot.release()
+
+        self._counts["completed"] += 1
+        self.generation_latency.add((time.perf_counter() - t0) * 1000)
+        return answer
+
+    async def stream(self, prompt: str, slot: Slot = None):
+        """
+        Async generator of answer tokens from Ollama's streaming API.
+
+        Pass a slot from acquire() to reserve capacity before the HTTP
+        response starts (so overload can still become a 503). Closing the
+        generator early closes the upstream response, which makes Ollama
+        abort the generation.
+        """
+        if slot is None:
+            slot = await self.acquire()
+
+        self.in_flight += 1
+        t0 = time.perf_counter()
+        first_token = True
+
+        try:
+            async with self._client.stream(
+                "POST", "/api/generate", json=self._payload(prompt, True)
+            ) as response:
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token:
+                            self.ttft_latency.add((time.perf_counter() - t0) * 1000)
+                            first_token = False
+                        yield token
+
+                    if chunk.get("done"):
+                        break
+
+            self._counts["completed"] += 1
+            self.generation_latency.add((time.perf_counter() - t0) * 1000)
+
+        except (GeneratorExit, asyncio.CancelledError):
+            self._counts["cancelled"] += 1
+            raise
+        except Exception:
+            self._counts["errors"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            slot.release()
 
-def generate_answer(prompt: str) -> str:
-    payload = {
-        "model": OLLAMA_MODEL,
-        "prompt": prompt,
-        "stream": False
-    }
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "queue_wait": self.queue_wait.summary(),
+            "generation": self.generation_latency.summary(),
+            "ttft": self.ttft_latency.summary(),
+            "shared_in_flight": len(self._flights) + len(self._streams),
+            **self._counts,
+        }
 
-    response = requests.post(
-        f"{OLLAMA_URL}/api/generate",
-        json=payload,
-        timeout=120
-    )
 
-    response.raise_for_status()
-    return response.json()["response"]
+ollama = OllamaClient()
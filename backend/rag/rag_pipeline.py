@@ -1,11 +1,25 @@
 # backend/rag/rag_pipeline.py
-from rag.retriever import retrieve_context
-from services.gemini_client import generate_answer
+import time
+import logging
 
-def answer_question(question: str) -> dict:
-    context = retrieve_context(question)
+from fastapi.concurrency import run_in_threadpool
 
-    prompt = f"""
+from backend.cache import data_version
+from backend.rag.retriever import FAISS_ENABLED, retrieval_service, retrieve_context
+from backend.rag.ollama_client import ollama
+from backend.rag.answer_cache import answer_cache
+from backend.rag.context_hydrator import context_hydrator, pack_context
+from backend.services.chat_engine import fast_path
+
+logger = logging.getLogger(__name__)
+
+
+def build_prompt(question: str, context: str) -> str:
+    # Without retrieval hits the question goes to the model as-is
+    if not context:
+        return question
+
+    return f"""
 You are an analyst for Y Combinator data.
 
 Context:
@@ -15,9 +29,120 @@ Question:
 {question}
 """
 
-    answer = generate_answer(prompt)
+
+def answer_version():
+    """
+    Cached answers are only valid for one scrape/scores version and one
+    FAISS index; None means the version is unknown and caching is skipped.
+    """
+    try:
+        return f"{data_version()}:{retrieval_service.index_version}"
+    except Exception as e:
+        logger.warning("Answer cache bypassed, data version unavailable: %s", e)
+        return None
+
+
+def embed_question(question: str):
+    if not FAISS_ENABLED:
+        return None
+
+    try:
+        return retrieval_service.embed(question)
+    except Exception as e:
+        logger.warning("Question embedding failed: %s", e)
+        return None
+
+
+def hydrate_context(hits) -> str:
+    if not hits:
+        return ""
+
+    try:
+        return pack_context(context_hydrator.hydrate(hits))
+    except Exception as e:
+        # Names alone are still better than no context
+        logger.warning("Context hydration failed: %s", e)
+        return "\n".join(h["name"] for h in hits)
+
+
+def answer_fast_path(question: str, vector):
+    encode = retrieval_service.encode if retrieval_service.ready else None
+    try:
+        return fast_path(question, vector, encode)
+    except Exception as e:
+        logger.warning("Chat fast path failed: %s", e)
+        return None
+
+
+def prepare_answer(question: str) -> dict:
+    """
+    Everything before the LLM call: fast-path intents, cache lookup,
+    retrieval, context hydration and prompt. When the LLM is not needed
+    the answer comes back under "result" (with "served_by") and no
+    prompt. Stage latencies are reported in "timings".
+    """
+    timings = {}
+    t0 = time.perf_counter()
+
+    def lap(stage):
+        nonlocal t0
+        now = time.perf_counter()
+        timings[f"{stage}_ms"] = round((now - t0) * 1000, 1)
+        t0 = now
+
+    # Embedded once: used for intents, the semantic cache and retrieval
+    vector = embed_question(question)
+    lap("embed")
+
+    # Leaderboard / trends / search questions are answered from the DB
+    fast = answer_fast_path(question, vector)
+    lap("fast_path")
+    if fast is not None:
+        return {"result": fast, "served_by": "fast_path", "timings": timings}
+
+    version = answer_version()
+    cached = None
+    if version is not None:
+        cached = answer_cache.get(question, version, vector)
+    lap("cache")
+    if cached is not None:
+        return {"result": cached, "served_by": "answer_cache", "timings": timings}
+
+    hits = retrieve_context(question, vector=vector)
+    lap("retrieve")
+
+    context = hydrate_context(hits)
+    lap("hydrate")
 
     return {
+        "result": None,
+        "served_by": "llm",
+        "version": version,
+        "vector": vector,
+        "sources": hits,
+        "prompt": build_prompt(question, context),
+        "timings": timings,
+    }
+
+
+def finish_answer(question: str, prepared: dict, answer: str) -> dict:
+    result = {
         "answer": answer,
-        "sources": context,
+        "sources": prepared["sources"],
     }
+
+    if prepared["version"] is not None:
+        answer_cache.put(question, prepared["version"], result, prepared["vector"])
+
+    return result
+
+
+async def answer_question(question: str) -> dict:
+    # Retrieval is CPU/DB work; the LLM call itself is async
+    prepared = await run_in_threadpool(prepare_answer, question)
+    if prepared["result"] is not None:
+        return prepared["result"]
+
+    answer = await ollama.generate(prepared["prompt"])
+
+    return finish_answer(question, prepared, answer)
@@ -1,30 +1,218 @@
 # backend/rag/retriever.py
 import os
+import time
+import logging
+import threading
+
+from backend.timing import LatencyWindow
+from backend.rag.embedding_batcher import EmbeddingBatcher
+from backend.rag.metadata_store import MetadataStore, convert_legacy_json
+
+logger = logging.getLogger(__name__)
 
 FAISS_ENABLED = os.getenv("USE_FAISS", "false").lower() == "true"
 
-def retrieve_context(question: str, top_k: int = 5):
-    if not FAISS_ENABLED:
-        # Fallback: no vector search
-        return []
+RAG_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.getenv("RAG_INDEX_PATH", os.path.join(RAG_DIR, "vector_store.faiss"))
+META_PATH = os.getenv("RAG_META_PATH", os.path.join(RAG_DIR, "metadata.bin"))
+EMBED_MODEL = os.getenv("RAG_EMBED_MODEL", "all-MiniLM-L6-v2")
 
-    try:
-        import faiss
+# Encoded once after loading so the first real question is not slow ("" disables)
+RAG_WARMUP_QUERY = os.getenv("RAG_WARMUP_QUERY", "top fintech startups")
+# How often a query may stat() the index file to look for a new build
+RAG_RELOAD_CHECK_S = float(os.getenv("RAG_RELOAD_CHECK_S", "10"))
+# Coalesce concurrent question encodes (see embedding_batcher.py)
+RAG_BATCHING = os.getenv("RAG_BATCHING", "true").lower() == "true"
+# Map the index file instead of copying it into each worker's heap
+RAG_INDEX_MMAP = os.getenv("RAG_INDEX_MMAP", "true").lower() == "true"
+
+
+class RetrievalService:
+    """
+    Holds the embedding model, FAISS index and metadata for the life of
+    the process. A new index written by embed_companies.py is loaded in
+    the background and swapped in atomically; queries in flight keep
+    using the previous one.
+    """
+
+    def __init__(self, index_path=INDEX_PATH, meta_path=META_PATH, model_name=EMBED_MODEL):
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.model_name = model_name
+
+        self.model = None
+        self.batcher = None
+        # (index, metadata, index mtime) replaced as a single reference
+        self._state = None
+        self._load_lock = threading.Lock()
+        self._last_check = 0.0
+        self._reloading = False
+
+        self.model_load_ms = None
+        self.index_load_ms = None
+        self.index_spec = None
+        self.loaded_at = None
+        self.encode_latency = LatencyWindow()
+        self.search_latency = LatencyWindow()
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None and self._state is not None
+
+    def load(self, warmup_query=RAG_WARMUP_QUERY):
         from sentence_transformers import SentenceTransformer
-        import json
-        import numpy as np
 
-        model = SentenceTransformer("all-MiniLM-L6-v2")
-        index = faiss.read_index("rag/vector_store.faiss")
+        with self._load_lock:
+            if self.model is None:
+                t0 = time.perf_counter()
+                self.model = SentenceTransformer(self.model_name)
+                self.model_load_ms = (time.perf_counter() - t0) * 1000
+
+            if RAG_BATCHING and self.batcher is None:
+                self.batcher = EmbeddingBatcher(self.encode)
+
+            if self._state is None:
+                self._state = self._read_index()
+
+        if warmup_query:
+            self.search(warmup_query, top_k=1)
+
+        logger.info(
+            "Retrieval service ready (model %.0fms, index %.0fms, %d vectors)",
+            self.model_load_ms, self.index_load_ms, self._state[0].ntotal
+        )
+
+    def _read_index(self):
+        import faiss
+        from backend.rag.index_factory import load_index_params, apply_search_params
+
+        t0 = time.perf_counter()
+        mtime = os.path.getmtime(self.index_path)
+        index = self._read_faiss(faiss)
+
+        self.index_spec = load_index_params(self.index_path)
+        apply_search_params(index, self.index_spec)
+
+        # Vectors are labelled with company ids; the store maps them back
+        convert_legacy_json(self.meta_path)
+        metadata = MetadataStore(self.meta_path)
 
-        with open("rag/metadata.json", "r", encoding="utf-8") as f:
-            metadata = json.load(f)
+        self.index_load_ms = (time.perf_counter() - t0) * 1000
+        self.loaded_at = time.time()
+        return index, metadata, mtime
 
-        query_embedding = model.encode([question]).astype("float32")
+    def _read_faiss(self, faiss):
+        if RAG_INDEX_MMAP:
+            flags = (
+                faiss.IO_FLAG_MMAP
+                | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+                | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+            )
+            try:
+                return faiss.read_index(self.index_path, flags)
+            except RuntimeError as e:
+                logger.warning("Index type cannot be memory-mapped, reading into memory: %s", e)
+
+        return faiss.read_index(self.index_path)
+
+    def reload(self):
+        """
+        Load the index currently on disk and swap it in.
+        """
+        try:
+            with self._load_lock:
+                self._state = self._read_index()
+            logger.info("Reloaded FAISS index in %.0fms", self.index_load_ms)
+        except Exception:
+            logger.exception("FAISS index reload failed; keeping the previous index")
+        finally:
+            self._reloading = False
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._reloading or now - self._last_check < RAG_RELOAD_CHECK_S:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return
+
+        if mtime != self._state[2]:
+            self._reloading = True
+            threading.Thread(target=self.reload, daemon=True).start()
+
+    def encode(self, texts):
+        t0 = time.perf_counter()
+        vectors = self.model.encode(texts).astype("float32")
+        self.encode_latency.add((time.perf_counter() - t0) * 1000)
+        return vectors
+
+    @property
+    def index_version(self):
+        """
+        Changes whenever a new index is swapped in.
+        """
+        return self._state[2] if self._state else None
+
+    def embed(self, question: str):
+        """
+        Encode one question (through the batcher when enabled).
+        """
+        if not self.ready:
+            self.load(warmup_query=None)
+
+        if self.batcher is not None:
+            return self.batcher.encode(question)
+        return self.encode([question])[0]
+
+    def search(self, question: str, top_k: int = 5, vector=None):
+        if not self.ready:
+            self.load(warmup_query=None)
+
+        self._maybe_reload()
+        index, metadata, _ = self._state
+
+        if vector is None:
+            vector = self.embed(question)
+        query_embedding = vector[None, :]
+
+        t0 = time.perf_counter()
         distances, indices = index.search(query_embedding, top_k)
+        self.search_latency.add((time.perf_counter() - t0) * 1000)
+
+        hits = (metadata.get(int(i)) for i in indices[0] if i >= 0)
+        return [m for m in hits if m is not None]
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "enabled": FAISS_ENABLED,
+            "ready": self.ready,
+            "model": self.model_name,
+            "model_load_ms": self.model_load_ms,
+            "index_load_ms": self.index_load_ms,
+            "index_vectors": state[0].ntotal if state else None,
+            "index_spec": self.index_spec,
+            "loaded_at": self.loaded_at,
+            "encode": self.encode_latency.summary(),
+            "search": self.search_latency.summary(),
+            "batching": self.batcher.stats() if self.batcher else None,
+        }
+
+
+retrieval_service = RetrievalService()
+
 
-        return [metadata[i] for i in indices[0] if i < len(metadata)]
+def retrieve_context(question: str, top_k: int = 5, vector=None):
+    if not FAISS_ENABLED:
+        # Fallback: no vector search
+        return []
+
+    try:
+        return retrieval_service.search(question, top_k, vector=vector)
 
     except Exception as e:
-        print("FAISS disabled or failed:", e)
+        logger.warning("FAISS disabled or failed: %s", e)
         return []
@@ -1,10 +1,24 @@
-from fastapi import APIRouter, HTTPException
+import json
+import time
+import logging
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from fastapi.concurrency import run_in_threadpool
-from backend.rag.ollama_client import generate_answer
+from starlette.background import BackgroundTask
+from backend.rag.rag_pipeline import answer_question, prepare_answer, finish_answer
+from backend.rag.ollama_client import ollama, LLMOverloaded
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Chat"])
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
 
 class ChatRequest(BaseModel):
     question: str
@@ -14,16 +28,137 @@ class ChatResponse(BaseModel):
     answer: str
 
 
-@router.post("/", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+def _question(req: ChatRequest) -> str:
     question = req.question.strip()
 
     if not question:
         raise HTTPException(status_code=400, detail="Question cannot be empty")
 
+    return question
+
+
+def _overloaded(e: LLMOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+@router.post("/", response_model=ChatResponse)
+async def chat(req: ChatRequest):
+    question = _question(req)
+
+    try:
+        result = await answer_question(question)
+        return {"answer": result["answer"]}
+    except LLMOverloaded as e:
+        raise _overloaded(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _event(fmt: str, payload: dict) -> str:
+    data = json.dumps(payload, default=str, ensure_ascii=False)
+    if fmt == "sse":
+        return f"event: {payload['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@router.post("/stream")
+async def chat_stream(
+    req: ChatRequest,
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+):
+    """
+    Relays answer tokens as they are generated.
+
+    Events: `sources`, then `token` chunks, then `done` (with ttft_ms and
+    total_ms) or `error`. A client disconnect stops the Ollama generation.
+    """
+    question = _question(req)
+    started = time.perf_counter()
+
     try:
-        # ✅ NON-BLOCKING
-        answer = await run_in_threadpool(generate_answer, question)
-        return {"answer": answer}
+        prepared = await run_in_threadpool(prepare_answer, question)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    if prepared["result"] is not None:
+        return StreamingResponse(
+            _ready_events(format, prepared, started),
+            media_type=STREAM_MEDIA_TYPES[format],
+        )
+
+    # Joins an identical generation in flight, otherwise reserves an LLM
+    # slot before the response starts so overload is still a 503
+    try:
+        tokens_stream = await ollama.open_stream(prepared["prompt"])
+    except LLMOverloaded as e:
+        raise _overloaded(e)
+
+    return StreamingResponse(
+        _token_events(format, request, question, prepared, tokens_stream, started),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Leaves the shared stream even if the body was never iterated
+        background=BackgroundTask(tokens_stream.aclose),
+    )
+
+
+async def _token_events(fmt, request, question, prepared, tokens_stream, started):
+    yield _event(fmt, {"type": "sources", "sources": prepared["sources"]})
+
+    tokens = []
+    ttft_ms = None
+    try:
+        async for token in tokens_stream:
+            if await request.is_disconnected():
+                logger.info("Chat stream client disconnected after %d tokens", len(tokens))
+                return
+
+            if ttft_ms is None:
+                ttft_ms = _ms(started)
+                logger.info("Chat stream TTFT %.0fms", ttft_ms)
+
+            tokens.append(token)
+            yield _event(fmt, {"type": "token", "token": token})
+
+    except Exception as e:
+        logger.exception("Chat stream failed")
+        yield _event(fmt, {"type": "error", "detail": str(e)})
+        return
+    finally:
+        # Stops the generation once no other client shares it
+        await tokens_stream.aclose()
+
+    finish_answer(question, prepared, "".join(tokens))
+    yield _event(fmt, {
+        "type": "done",
+        "served_by": prepared["served_by"],
+        "ttft_ms": ttft_ms,
+        "total_ms": _ms(started),
+        "timings": prepared["timings"],
+    })
+
+
+async def _ready_events(fmt: str, prepared: dict, started: float):
+    """
+    An answer that needed no generation, sent as a single token.
+    """
+    result = prepared["result"]
+    yield _event(fmt, {"type": "sources", "sources": result["sources"]})
+    yield _event(fmt, {"type": "token", "token": result["answer"]})
+    yield _event(fmt, {
+        "type": "done",
+        "served_by": prepared["served_by"],
+        "intent": result.get("intent"),
+        "ttft_ms": _ms(started),
+        "total_ms": _ms(started),
+        "timings": prepared["timings"],
+    })
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
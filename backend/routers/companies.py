@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from psycopg2.extras import RealDictCursor
 from backend.db import get_db
+from backend.cache import cached_json
+from backend.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(
     prefix="/api/companies",
@@ -11,30 +13,58 @@ router = APIRouter(
 # LIST COMPANIES
 # =========================
 @router.get("")
-def list_companies(db=Depends(get_db)):
-    cur = db.cursor(cursor_factory=RealDictCursor)
+def list_companies(
+    request: Request,
+    cursor: str = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(200, ge=1, le=1000),
+    db=Depends(get_db)
+):
+    """
+    Companies ordered by (name, id). The body stays a plain array; when
+    more rows exist the cursor for the next page is sent in X-Next-Cursor.
+    """
+    params = {"limit": limit + 1}
+    after_clause = ""
+
+    if cursor:
+        params["after_name"], params["after_id"] = decode_cursor(cursor, "name", (str, int))
+        after_clause = "WHERE (name, id) > (%(after_name)s, %(after_id)s)"
+
+    def build(headers):
+        cur = db.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute(f"""
+                SELECT
+                    id,
+                    name,
+                    slug,
+                    domain,
+                    founded_year,
+                    is_active
+                FROM companies
+                {after_clause}
+                ORDER BY name, id
+                LIMIT %(limit)s
+            """, params)
+            rows = cur.fetchall()
+
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers["X-Next-Cursor"] = encode_cursor(
+                    "name", [rows[-1]["name"], rows[-1]["id"]]
+                )
+
+            return rows
+
+        finally:
+            cur.close()
+
     try:
-        cur.execute("""
-            SELECT
-                id,
-                name,
-                slug,
-                domain,
-                founded_year,
-                is_active
-            FROM companies
-            ORDER BY name
-            LIMIT 200
-        """)
-        return cur.fetchall()
+        return cached_json(request, db, build)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        cur.close()
-        db.close()
-
 
 # =========================
 # COMPANY DETAIL
@@ -62,5 +92,4 @@ def company_detail(company_id: int, db=Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
     finally:
-        cur.close()
-        db.close()
\ No newline at end of file
+        cur.close()
\ No newline at end of file
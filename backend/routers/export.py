@@ -0,0 +1,166 @@
+import io
+import os
+import csv
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from psycopg2.extras import RealDictCursor
+from backend.db import db_connection
+
+router = APIRouter(prefix="/api/export", tags=["Export"])
+
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+
+# Company + latest snapshot + scores, one row per company
+EXPORT_SQL = """
+    SELECT
+        c.id,
+        c.slug,
+        c.name,
+        c.domain,
+        c.founded_year,
+        c.is_active,
+        cl.batch,
+        cl.stage,
+        cl.description,
+        cl.location,
+        cl.tags,
+        cl.employee_range,
+        cl.scraped_at,
+        cl.snapshot_hash,
+        sc.momentum_score,
+        sc.stability_score,
+        sc.last_updated AS scores_updated_at
+    FROM companies c
+    LEFT JOIN company_latest cl ON cl.company_id = c.id
+    LEFT JOIN company_scores sc ON sc.company_id = c.id
+    ORDER BY c.id
+"""
+
+EXPORT_COLUMNS = [
+    "id", "slug", "name", "domain", "founded_year", "is_active",
+    "batch", "stage", "description", "location", "tags", "employee_range",
+    "scraped_at", "snapshot_hash",
+    "momentum_score", "stability_score", "scores_updated_at",
+]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (datetime, date, Decimal)):
+        return _json_default(value)
+    return value
+
+
+def _iter_batches(fetch_size):
+    """
+    Yield lists of rows from a named (server-side) cursor, so only one
+    batch of `fetch_size` rows is held in memory at a time.
+
+    The connection is borrowed here rather than through Depends(get_db):
+    dependencies are torn down before a streaming body finishes sending.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor(
+            name=f"export_{uuid.uuid4().hex}",
+            cursor_factory=RealDictCursor
+        )
+
+        try:
+            cur.execute(EXPORT_SQL)
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield rows
+
+        finally:
+            cur.close()
+
+
+def _ndjson_stream(fetch_size):
+    batches = _iter_batches(fetch_size)
+    try:
+        for rows in batches:
+            yield "".join(
+                json.dumps(row, default=_json_default, ensure_ascii=False) + "\n"
+                for row in rows
+            )
+    finally:
+        # Returns the connection to the pool even when the client left early
+        batches.close()
+
+
+def _csv_stream(fetch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    batches = _iter_batches(fetch_size)
+    try:
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+
+            for row in rows:
+                writer.writerow([_csv_value(row[col]) for col in EXPORT_COLUMNS])
+
+            yield buffer.getvalue()
+    finally:
+        batches.close()
+
+
+def _close_stream(stream):
+    """
+    Close an export generator once the response is over. An aborted
+    download never exhausts it, and waiting for garbage collection would
+    keep its pooled connection checked out.
+    """
+    try:
+        stream.close()
+    except ValueError:
+        # Mid-step in a threadpool thread at the moment of disconnect;
+        # rare, and garbage collection still closes it afterwards
+        pass
+
+
+@router.get("/companies")
+def export_companies(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fetch_size: int = Query(EXPORT_FETCH_SIZE, ge=100, le=20000),
+):
+    """
+    Stream every company with its latest snapshot and scores. Rows are
+    sent as they are fetched, so API memory stays flat as the data grows.
+    """
+    if format == "csv":
+        stream = _csv_stream(fetch_size)
+        return StreamingResponse(
+            stream,
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="companies.csv"'},
+            background=BackgroundTask(_close_stream, stream)
+        )
+
+    stream = _ndjson_stream(fetch_size)
+    return StreamingResponse(
+        stream,
+        media_type="application/x-ndjson",
+        background=BackgroundTask(_close_stream, stream)
+    )
@@ -1,53 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
-from psycopg2.extras import RealDictCursor
-from backend.db import get_db
+from fastapi import APIRouter, Depends, Request
+from backend.cache import cached_json_async
+from backend.db_async import get_async_pool, fetch_many
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
+# Top momentum companies
+TOP_MOMENTUM_SQL = """
+    SELECT c.name, s.momentum_score
+    FROM company_scores s
+    JOIN companies c ON c.id = s.company_id
+    ORDER BY s.momentum_score DESC
+    LIMIT 10
+"""
+
+# Most stable companies
+MOST_STABLE_SQL = """
+    SELECT c.name, s.stability_score
+    FROM company_scores s
+    JOIN companies c ON c.id = s.company_id
+    ORDER BY s.stability_score DESC
+    LIMIT 10
+"""
+
+# Recent changes
+RECENT_CHANGES_SQL = """
+    SELECT c.name, ch.change_type, ch.detected_at
+    FROM company_changes ch
+    JOIN companies c ON c.id = ch.company_id
+    ORDER BY ch.detected_at DESC
+    LIMIT 10
+"""
+
+
+async def load_leaderboard(pool) -> dict:
+    # The three queries are independent, so run them side by side
+    top_momentum, most_stable, recent_changes = await fetch_many(
+        pool,
+        TOP_MOMENTUM_SQL,
+        MOST_STABLE_SQL,
+        RECENT_CHANGES_SQL,
+    )
+
+    return {
+        "top_momentum": top_momentum,
+        "most_stable": most_stable,
+        "recent_changes": recent_changes
+    }
+
 
 @router.get("")
-def leaderboard(db=Depends(get_db)):
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database not connected")
-
-    cur = db.cursor(cursor_factory=RealDictCursor)
-
-    try:
-        # Top momentum companies
-        cur.execute("""
-            SELECT c.name, s.momentum_score
-            FROM company_scores s
-            JOIN companies c ON c.id = s.company_id
-            ORDER BY s.momentum_score DESC
-            LIMIT 10
-        """)
-        top_momentum = cur.fetchall()
-
-        # Most stable companies
-        cur.execute("""
-            SELECT c.name, s.stability_score
-            FROM company_scores s
-            JOIN companies c ON c.id = s.company_id
-            ORDER BY s.stability_score DESC
-            LIMIT 10
-        """)
-        most_stable = cur.fetchall()
-
-        # Recent changes
-        cur.execute("""
-            SELECT c.name, ch.change_type, ch.detected_at
-            FROM company_changes ch
-            JOIN companies c ON c.id = ch.company_id
-            ORDER BY ch.detected_at DESC
-            LIMIT 10
-        """)
-        recent_changes = cur.fetchall()
-
-        return {
-            "top_momentum": top_momentum,
-            "most_stable": most_stable,
-            "recent_changes": recent_changes
-        }
-
-    finally:
-        cur.close()
+async def leaderboard(request: Request, pool=Depends(get_async_pool)):
+    async def build(headers):
+        return await load_leaderboard(pool)
+
+    return await cached_json_async(request, pool, build)
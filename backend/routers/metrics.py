@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+
+from backend.db import pool_stats
+from backend.cache import cache_stats
+from backend.db_async import async_pool_stats
+from backend.rag.retriever import retrieval_service
+from backend.rag.answer_cache import answer_cache
+from backend.rag.ollama_client import ollama
+from backend.rag.context_hydrator import context_hydrator
+from backend.services.chat_engine import intent_stats
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+
+@router.get("")
+def metrics():
+    return {
+        "db_pool": pool_stats(),
+        "async_db_pool": async_pool_stats(),
+        "response_cache": cache_stats(),
+        "retrieval": retrieval_service.stats(),
+        "answer_cache": answer_cache.stats(),
+        "llm": ollama.stats(),
+        "context": context_hydrator.stats(),
+        "chat_intents": intent_stats(),
+    }
@@ -1,60 +1,109 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from psycopg2.extras import RealDictCursor
 from backend.db import get_db
+from backend.cache import cached_json
+from backend.pagination import encode_cursor, decode_cursor
 from backend.services.search_engine import search_companies_service
 
 
 router = APIRouter()
 
+# Keyset sort keys; ties are broken by company id
+SORT_KEYS = {
+    "relevance": "ts_rank(cs.search_vector, plainto_tsquery('english', %(q)s))",
+    "momentum": "COALESCE(sc.momentum_score, 0)",
+}
+
+# Cast cursor values back to the sort key's type so the row comparison is exact
+SORT_KEY_CASTS = {
+    "relevance": "real",
+    "momentum": "integer",
+}
+
+# Python types a decoded cursor must have: (sort key, id)
+SORT_KEY_TYPES = {
+    "relevance": (float, int),
+    "momentum": (int, int),
+}
+
+
 @router.get("/search", tags=["Search"])
 def search_companies(
+    request: Request,
     q: str = Query(..., min_length=2, description="Search keywords"),
-    page: int = Query(1, ge=1),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    page: int = Query(None, ge=1, description="Deprecated: only page 1 is accepted; follow next_cursor"),
     limit: int = Query(20, ge=1, le=50),
     sort: str = Query("relevance", pattern="^(relevance|momentum)$"),
     db=Depends(get_db)
 ):
-    offset = (page - 1) * limit
-    cur = db.cursor(cursor_factory=RealDictCursor)
+    """
+    Keyset-paginated search. Pages after the first are reached through
+    next_cursor; the old page parameter is still accepted for page 1.
+    """
+    if page is not None and page > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="page is no longer supported beyond 1; pass next_cursor as cursor instead"
+        )
 
-    order_clause = (
-        "ts_rank(cs.search_vector, plainto_tsquery('english', %s)) DESC"
-        if sort == "relevance"
-        else "sc.momentum_score DESC NULLS LAST"
-    )
+    params = {"q": q, "limit": limit + 1}
+    after_clause = ""
 
-    sql = f"""
-        WITH latest_snapshot AS (
-            SELECT DISTINCT ON (company_id)
-                company_id,
-                search_vector
-            FROM company_snapshots
-            ORDER BY company_id, scraped_at DESC
+    if cursor:
+        params["after_key"], params["after_id"] = decode_cursor(cursor, sort, SORT_KEY_TYPES[sort])
+        after_clause = (
+            f"AND (hits.sort_key, hits.id) < "
+            f"(%(after_key)s::{SORT_KEY_CASTS[sort]}, %(after_id)s)"
         )
-        SELECT
-            c.id,
-            c.name,
-            c.domain,
-            sc.momentum_score
-        FROM companies c
-        JOIN latest_snapshot cs ON cs.company_id = c.id
-        LEFT JOIN company_scores sc ON sc.company_id = c.id
-        WHERE cs.search_vector @@ plainto_tsquery('english', %s)
-        ORDER BY {order_clause}
-        LIMIT %s OFFSET %s
+
+    sql = f"""
+        SELECT id, name, domain, momentum_score, sort_key
+        FROM (
+            SELECT
+                c.id,
+                c.name,
+                c.domain,
+                sc.momentum_score,
+                {SORT_KEYS[sort]} AS sort_key
+            FROM companies c
+            JOIN company_latest cs ON cs.company_id = c.id
+            LEFT JOIN company_scores sc ON sc.company_id = c.id
+            WHERE cs.search_vector @@ plainto_tsquery('english', %(q)s)
+        ) hits
+        WHERE TRUE {after_clause}
+        ORDER BY hits.sort_key DESC, hits.id DESC
+        LIMIT %(limit)s
     """
 
-    try:
-        cur.execute(sql, (q, q, limit, offset))
-        results = cur.fetchall()
+    def build(headers):
+        cur = db.cursor(cursor_factory=RealDictCursor)
+
+        try:
+            cur.execute(sql, params)
+            results = cur.fetchall()
+
+            # One extra row tells us whether another page exists
+            next_cursor = None
+            if len(results) > limit:
+                results = results[:limit]
+                last = results[-1]
+                next_cursor = encode_cursor(sort, [last["sort_key"], last["id"]])
+
+            for r in results:
+                r.pop("sort_key")
+
+            return {
+                "query": q,
+                # Kept for old clients; only the first page has a number
+                "page": None if cursor else 1,
+                "limit": limit,
+                "count": len(results),
+                "next_cursor": next_cursor,
+                "results": results
+            }
 
-        return {
-            "query": q,
-            "page": page,
-            "limit": limit,
-            "count": len(results),
-            "results": results
-        }
+        finally:
+            cur.close()
 
-    finally:
-        cur.close()
+    return cached_json(request, db, build)
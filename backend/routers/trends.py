@@ -1,32 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from psycopg2.extras import RealDictCursor
 from backend.db import get_db
+from backend.cache import cached_json
 
 router = APIRouter(prefix="/api/trends", tags=["Trends"])
 
 
 @router.get("")
-def trends(db=Depends(get_db)):
+def trends(request: Request, db=Depends(get_db)):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
 
-    cur = db.cursor(cursor_factory=RealDictCursor)
-
-    try:
-        # 🔹 Trend = most common tags across companies
-        cur.execute("""
-            SELECT
-                tag AS category,
-                COUNT(*) AS count
-            FROM company_snapshots,
-                 LATERAL jsonb_array_elements_text(tags) AS tag
-            GROUP BY tag
-            ORDER BY count DESC
-            LIMIT 20
-        """)
-
-        return cur.fetchall()   # ✅ RETURNS ARRAY
-
-    finally:
-        cur.close()
-        db.close()
\ No newline at end of file
+    def build(headers):
+        cur = db.cursor(cursor_factory=RealDictCursor)
+
+        try:
+            # 🔹 Trend = most common tags across companies
+            # (trend_tag_counts is maintained by the scrapers)
+            cur.execute("""
+                SELECT
+                    tag AS category,
+                    company_count AS count
+                FROM trend_tag_counts
+                ORDER BY company_count DESC
+                LIMIT 20
+            """)
+
+            return cur.fetchall()   # ✅ RETURNS ARRAY
+
+        finally:
+            cur.close()
+
+    return cached_json(request, db, build)
@@ -0,0 +1,85 @@
+"""
+Compare leaderboard latency: the old sync path (three queries in a row on
+one psycopg2 connection) against the async path (three asyncpg queries
+awaited together).
+
+    python backend/scripts/bench_leaderboard.py --runs 50
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from backend.db import db_connection, init_pool, close_pool
+from backend.db_async import init_async_pool, close_async_pool
+from backend.routers.leaderboard import (
+    TOP_MOMENTUM_SQL,
+    MOST_STABLE_SQL,
+    RECENT_CHANGES_SQL,
+    load_leaderboard,
+)
+
+
+def run_sync_once():
+    with db_connection() as db:
+        cur = db.cursor()
+        for sql in (TOP_MOMENTUM_SQL, MOST_STABLE_SQL, RECENT_CHANGES_SQL):
+            cur.execute(sql)
+            cur.fetchall()
+        cur.close()
+
+
+def summarize(label, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[int(0.95 * (len(samples_ms) - 1))]
+    print(
+        f"{label:<18} "
+        f"mean={statistics.mean(samples_ms):7.1f}ms  "
+        f"p50={statistics.median(samples_ms):7.1f}ms  "
+        f"p95={p95:7.1f}ms"
+    )
+
+
+async def bench_async(runs):
+    pool = await init_async_pool()
+    await load_leaderboard(pool)  # warm-up
+
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        await load_leaderboard(pool)
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    await close_async_pool()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    init_pool()
+    run_sync_once()  # warm-up
+
+    sync_samples = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        run_sync_once()
+        sync_samples.append((time.perf_counter() - t0) * 1000)
+    close_pool()
+
+    async_samples = asyncio.run(bench_async(args.runs))
+
+    print(f"Leaderboard latency over {args.runs} runs")
+    summarize("sync (sequential)", sync_samples)
+    summarize("async (gather)", async_samples)
+
+
+if __name__ == "__main__":
+    main()
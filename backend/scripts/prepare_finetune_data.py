@@ -7,7 +7,7 @@ from dotenv import load_dotenv
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
-from db import get_db
+from db import db_connection
 
 load_dotenv()
 
@@ -15,33 +15,28 @@ OUTPUT_PATH = os.path.join(BASE_DIR, "finetune_data.jsonl")
 
 
 def main():
-  
-    db_gen = get_db()
-
-    if hasattr(db_gen, "__next__"):
-        db = next(db_gen)
-    else:
-        db = db_gen
-
-    cur = db.cursor()
-
-    cur.execute("""
-        SELECT
-            c.name,
-            c.domain,
-            cs.description,
-            cs.tags,
-            COALESCE(sc.momentum_score, 0)
-        FROM companies c
-        JOIN company_snapshots cs ON cs.company_id = c.id
-        LEFT JOIN company_scores sc ON sc.company_id = c.id
-        WHERE cs.description IS NOT NULL
-          AND cs.description <> ''
-          AND cs.tags IS NOT NULL
-        LIMIT 5000;
-    """)
-
-    rows = cur.fetchall()
+    with db_connection() as db:
+        cur = db.cursor()
+
+        cur.execute("""
+            SELECT
+                c.name,
+                c.domain,
+                cs.description,
+                cs.tags,
+                COALESCE(sc.momentum_score, 0)
+            FROM companies c
+            JOIN company_latest cs ON cs.company_id = c.id
+            LEFT JOIN company_scores sc ON sc.company_id = c.id
+            WHERE cs.description IS NOT NULL
+              AND cs.description <> ''
+              AND cs.tags IS NOT NULL
+            LIMIT 5000;
+        """)
+
+        rows = cur.fetchall()
+        cur.close()
+
     print(f"Fetched {len(rows)} rows")
 
     if not rows:
@@ -72,9 +67,6 @@ def main():
 
             f.write(json.dumps(record, ensure_ascii=False) + "\n")
 
-    cur.close()
-    db.close()
-
     print(f"✅ Fine-tuning dataset created at:\n{OUTPUT_PATH}")
 
 
@@ -1,8 +1,303 @@
 # backend/services/chat_engine.py
+import os
+import re
+import time
+import logging
+import threading
 
-from services.search_engine import search_companies_service
-from services.trend_engine import get_trends_service
-from services.leaderboard_engine import get_leaderboard_service
+import numpy as np
+
+from backend.timing import LatencyWindow
+from backend.services.search_engine import search_companies_service
+from backend.services.trend_engine import get_trends_service
+from backend.services.leaderboard_engine import get_leaderboard_service
+
+logger = logging.getLogger(__name__)
+
+# Embedding classifier: best exemplar similarity needed to trust an intent,
+# and how far ahead of the runner-up it must be
+CHAT_INTENT_SIMILARITY = float(os.getenv("CHAT_INTENT_SIMILARITY", "0.6"))
+CHAT_INTENT_MARGIN = float(os.getenv("CHAT_INTENT_MARGIN", "0.05"))
+CHAT_FAST_PATH_LIMIT = int(os.getenv("CHAT_FAST_PATH_LIMIT", "10"))
+
+# ------------------ KEYWORD RULES ------------------
+
+RULES = {
+    # A bare "top" is too common ("top-down", "on top of"); it only counts
+    # before a number or, within two words, a company noun
+    "leaderboard": re.compile(
+        r"\b(momentum|leaderboard|rankings?|ranked|hottest|fastest[- ]growing)\b"
+        r"|\btop[- ]?\d+\b"
+        r"|\btop\s+(?!of\b)(?:[\w-]+\s+){0,2}(companies|startups|yc)\b"
+    ),
+    "trends": re.compile(
+        r"\b(trend|trends|trending)\b|\b(popular|common)\b.*\b(tags?|categories|sectors|locations?)\b"
+    ),
+    "search": re.compile(r"^(search|find|look up|show me)\b"),
+}
+
+# Explicit search phrasing: everything after the verb is the query
+SEARCH_QUERY = re.compile(r"^(?:search(?: for)?|find|look up|show me)\s+(?P<query>.+)$")
+
+# Words that only say *what kind* of answer is wanted; anything left over
+# is a topic ("top fintech companies" -> "fintech")
+FILLER_WORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "by", "with", "to", "and", "or",
+    "what", "whats", "which", "who", "are", "is", "were", "show", "me", "list",
+    "give", "tell", "find", "search", "look", "up", "please", "right", "now",
+    "today", "currently", "most", "best", "top", "leading", "hottest", "highest",
+    "fastest", "growing", "momentum", "ranking", "rankings", "ranked", "leaderboard",
+    "trend", "trends", "trending", "popular", "common", "companies", "company",
+    "startups", "startup", "yc", "ycombinator", "combinator", "y",
+}
+
+# ------------------ EMBEDDING EXEMPLARS ------------------
+
+EXEMPLARS = {
+    "leaderboard": [
+        "top momentum companies",
+        "which startups have the highest momentum",
+        "show me the leaderboard",
+        "fastest growing YC companies",
+        "best performing startups right now",
+    ],
+    "trends": [
+        "what's trending",
+        "what are the most popular tags",
+        "which sectors are hot right now",
+        "most common startup locations",
+        "trending categories in YC",
+    ],
+    "search": [
+        "find companies building developer tools",
+        "search for fintech startups",
+        "companies working on climate tech",
+        "startups doing AI for healthcare",
+    ],
+    # Open questions that need retrieval + the LLM
+    "rag": [
+        "tell me about Stripe",
+        "compare Airbnb and DoorDash",
+        "why did this company pivot",
+        "explain what this startup does",
+        "who are the founders of this company",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Nearest-exemplar classifier over question embeddings. Exemplars are
+    encoded once, with the same model the retriever uses.
+    """
+
+    def __init__(self, exemplars=EXEMPLARS):
+        self.exemplars = exemplars
+        self._labels = None
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _load(self, encode):
+        with self._lock:
+            if self._matrix is None:
+                labels = [label for label, texts in self.exemplars.items() for _ in texts]
+                texts = [text for texts in self.exemplars.values() for text in texts]
+                self._matrix = _unit_rows(np.asarray(encode(texts), dtype="float32"))
+                self._labels = labels
+
+    def classify(self, vector, encode):
+        """
+        Returns (intent, score), or (None, score) when no intent is clearly
+        ahead.
+        """
+        if self._matrix is None:
+            self._load(encode)
+
+        scores = self._matrix @ _unit_rows(np.asarray(vector, dtype="float32")[None, :])[0]
+        best = {}
+        for label, score in zip(self._labels, scores):
+            best[label] = max(best.get(label, -1.0), float(score))
+
+        ranked = sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+        (intent, score), runner_up = ranked[0], ranked[1][1]
+
+        if score < CHAT_INTENT_SIMILARITY or score - runner_up < CHAT_INTENT_MARGIN:
+            return None, score
+        return intent, score
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+classifier = IntentClassifier()
+
+# ------------------ METRICS ------------------
+
+_lock = threading.Lock()
+_stats = {
+    "lookups": 0,
+    "fallbacks": {"no_intent": 0, "no_topic": 0, "no_results": 0, "errors": 0},
+    "methods": {"keyword": 0, "embedding": 0},
+}
+_intents = {}
+
+
+def _record_hit(intent, method, ms):
+    with _lock:
+        _stats["methods"][method] += 1
+        entry = _intents.setdefault(intent, {"hits": 0, "latency": LatencyWindow()})
+        entry["hits"] += 1
+    entry["latency"].add(ms)
+
+
+def _record_fallback(reason):
+    with _lock:
+        _stats["fallbacks"][reason] += 1
+
+
+def intent_stats() -> dict:
+    hits = sum(e["hits"] for e in _intents.values())
+    lookups = _stats["lookups"]
+    return {
+        "hit_rate": round(hits / lookups, 3) if lookups else None,
+        "intents": {
+            name: {
+                "hits": e["hits"],
+                "hit_rate": round(e["hits"] / lookups, 3) if lookups else None,
+                "latency": e["latency"].summary(),
+            }
+            for name, e in _intents.items()
+        },
+        **_stats,
+    }
+
+# ------------------ ROUTING ------------------
+
+
+def _normalize(question: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s-]", "", question.lower())).strip()
+
+
+def topic_words(q: str) -> str:
+    return " ".join(w for w in q.split() if w not in FILLER_WORDS)
+
+
+def classify(question: str, vector=None, encode=None):
+    """
+    Returns (intent, method) with intent None when the question should
+    go to RAG. Keyword rules win when exactly one matches; otherwise the
+    embedding classifier decides, if a question vector is available.
+    """
+    q = _normalize(question)
+    matches = [name for name, rule in RULES.items() if rule.search(q)]
+
+    if len(matches) == 1:
+        return matches[0], "keyword"
+
+    if vector is not None and encode is not None:
+        intent, _ = classifier.classify(vector, encode)
+        if intent in RULES:
+            return intent, "embedding"
+
+    return None, None
+
+
+def route(question: str, vector=None, encode=None):
+    """
+    Resolve a question to (intent, method, params), or None for RAG.
+    """
+    intent, method = classify(question, vector, encode)
+    if intent is None:
+        _record_fallback("no_intent")
+        return None
+
+    q = _normalize(question)
+    explicit = SEARCH_QUERY.match(q)
+    topic = topic_words(explicit.group("query") if explicit else q)
+
+    if intent == "leaderboard" and topic:
+        # "top fintech companies": a filtered ranking, not the global one
+        return "search", method, {"q": topic, "sort": "momentum"}
+
+    if intent == "search":
+        if not topic:
+            _record_fallback("no_topic")
+            return None
+        return "search", method, {"q": topic, "sort": "relevance"}
+
+    if intent == "trends" and topic:
+        # Trends for one sector need more than the global rollups
+        _record_fallback("no_topic")
+        return None
+
+    return intent, method, {}
+
+
+def _run(intent, params):
+    if intent == "leaderboard":
+        return get_leaderboard_service()
+    if intent == "trends":
+        return get_trends_service()
+    return search_companies_service(params["q"], limit=CHAT_FAST_PATH_LIMIT, sort=params["sort"])
+
+
+def _render(intent, params, data) -> str:
+    if intent == "leaderboard":
+        lines = [f"{i}. {r['name']} (momentum {r['momentum_score']})" for i, r in enumerate(data, 1)]
+        return "Top YC companies by momentum:\n" + "\n".join(lines)
+
+    if intent == "trends":
+        tags = ", ".join(f"{tag} ({n})" for tag, n in data["top_tags"])
+        locations = ", ".join(f"{loc} ({n})" for loc, n in data["top_locations"])
+        changes = ", ".join(f"{kind} ({n})" for kind, n in data["stage_transitions"])
+        return (
+            f"Most common tags: {tags}.\n"
+            f"Top locations: {locations}.\n"
+            f"Recent changes: {changes}."
+        )
+
+    order = "by momentum" if params["sort"] == "momentum" else "by relevance"
+    lines = [f"{i}. {r['name']} (momentum {r['momentum_score']})" for i, r in enumerate(data, 1)]
+    return f"Companies matching \"{params['q']}\", {order}:\n" + "\n".join(lines)
+
+
+def fast_path(question: str, vector=None, encode=None):
+    """
+    Answer from precomputed leaderboard / trends / search results when the
+    intent is clear; None sends the question on to RAG.
+    """
+    with _lock:
+        _stats["lookups"] += 1
+
+    t0 = time.perf_counter()
+    routed = route(question, vector, encode)
+    if routed is None:
+        return None
+    intent, method, params = routed
+
+    try:
+        data = _run(intent, params)
+    except Exception as e:
+        logger.warning("Fast path %s failed, falling back to RAG: %s", intent, e)
+        _record_fallback("errors")
+        return None
+
+    if not data:
+        _record_fallback("no_results")
+        return None
+
+    answer = _render(intent, params, data)
+    _record_hit(intent, method, (time.perf_counter() - t0) * 1000)
+
+    return {
+        "answer": answer,
+        "sources": [],
+        "intent": intent,
+        "data": data,
+    }
 
 
 def answer_question(question: str):
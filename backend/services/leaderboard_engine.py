@@ -1,20 +1,22 @@
 
 
-from backend.db import get_db
+
+from backend.db import db_connection
 
 def get_leaderboard_service():
-    db = get_db()
-    cur = db.cursor()
+    with db_connection() as db:
+        cur = db.cursor()
 
-    cur.execute("""
-        SELECT c.name, sc.momentum_score
-        FROM company_scores sc
-        JOIN companies c ON c.id = sc.company_id
-        ORDER BY sc.momentum_score DESC
-        LIMIT 10
-    """)
+        cur.execute("""
+            SELECT c.name, sc.momentum_score
+            FROM company_scores sc
+            JOIN companies c ON c.id = sc.company_id
+            ORDER BY sc.momentum_score DESC
+            LIMIT 10
+        """)
 
-    rows = cur.fetchall()
+        rows = cur.fetchall()
+        cur.close()
 
     # ✅ convert tuples → JSON-friendly dicts
     result = [
@@ -25,6 +27,4 @@ def get_leaderboard_service():
         for r in rows
     ]
 
-    cur.close()
-    db.close()
     return result
@@ -1,9 +1,7 @@
-from backend.db import get_db
 
-def search_companies_service(q: str, limit: int, sort: str):
-    conn = get_db()
-    cur = conn.cursor()
+from backend.db import db_connection
 
+def search_companies_service(q: str, limit: int, sort: str):
     order_by = """
         ts_rank(cs.search_vector, plainto_tsquery(%s)) DESC
     """ if sort == "relevance" else "sc.momentum_score DESC"
@@ -14,7 +12,7 @@ def search_companies_service(q: str, limit: int, sort: str):
             c.name,
             COALESCE(sc.momentum_score, 0) AS momentum
         FROM companies c
-        JOIN company_snapshots cs
+        JOIN company_latest cs
             ON cs.company_id = c.id
         LEFT JOIN company_scores sc
             ON sc.company_id = c.id
@@ -23,8 +21,12 @@ def search_companies_service(q: str, limit: int, sort: str):
         LIMIT %s
     """
 
-    cur.execute(query, (q, q, limit))
-    rows = cur.fetchall()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        params = (q, q, limit) if sort == "relevance" else (q, limit)
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        cur.close()
 
     return [
         {
@@ -1,37 +1,36 @@
-from backend.db import get_db
+
+from backend.db import db_connection
 
 def get_trends_service():
-    conn = get_db()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Top tags
+        cur.execute("""
+            SELECT tag, company_count
+            FROM trend_tag_counts
+            ORDER BY company_count DESC
+            LIMIT 10
+        """)
+        tags = cur.fetchall()
 
-    # Top tags
-    cur.execute("""
-        SELECT tag, COUNT(*) AS count
-        FROM company_snapshots,
-        jsonb_array_elements_text(tags) AS tag
-        GROUP BY tag
-        ORDER BY count DESC
-        LIMIT 10
-    """)
-    tags = cur.fetchall()
+        # Top locations
+        cur.execute("""
+            SELECT location, company_count
+            FROM trend_location_counts
+            ORDER BY company_count DESC
+            LIMIT 10
+        """)
+        locations = cur.fetchall()
 
-    # Top locations
-    cur.execute("""
-        SELECT location, COUNT(*)
-        FROM company_snapshots
-        GROUP BY location
-        ORDER BY COUNT(*) DESC
-        LIMIT 10
-    """)
-    locations = cur.fetchall()
+        # Change types
+        cur.execute("""
+            SELECT change_type, change_count
+            FROM trend_change_type_counts
+        """)
+        changes = cur.fetchall()
 
-    # Change types
-    cur.execute("""
-        SELECT change_type, COUNT(*)
-        FROM company_changes
-        GROUP BY change_type
-    """)
-    changes = cur.fetchall()
+        cur.close()
 
     return {
         "top_tags": tags,
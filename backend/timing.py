@@ -0,0 +1,37 @@
+import threading
+from collections import deque
+
+
+class LatencyWindow:
+    """
+    Rolling window of recent latency samples (ms) for metrics endpoints.
+    """
+
+    def __init__(self, size=1000):
+        self._samples = deque(maxlen=size)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+            self._count += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+
+        if not samples:
+            return {"count": count}
+
+        def pct(p):
+            return round(samples[int(p * (len(samples) - 1))], 2)
+
+        return {
+            "count": count,
+            "avg_ms": round(sum(samples) / len(samples), 2),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
@@ -0,0 +1,466 @@
+import os
+import time
+import json
+import asyncio
+import logging
+import argparse
+
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+from projections import ensure_projection_schema, refresh_company_latest
+from detail_http import make_session, fetch_company_http
+from html_detail_scraper import (
+    DETAIL_MODE,
+    DETAIL_MODES,
+    compute_snapshot_hash,
+    get_companies,
+    get_db_conn,
+    get_latest_snapshot_hash,
+    should_block,
+)
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Config
+# -----------------------------
+
+# Pages scraping at once, spread over DETAIL_CONTEXTS browser contexts
+DETAIL_CONCURRENCY = int(os.getenv("DETAIL_CONCURRENCY", "8"))
+DETAIL_CONTEXTS = int(os.getenv("DETAIL_CONTEXTS", "2"))
+DETAIL_RETRIES = int(os.getenv("DETAIL_RETRIES", "3"))
+DETAIL_TIMEOUT_MS = int(os.getenv("DETAIL_TIMEOUT_MS", "30000"))
+# Grace for the description block, which some companies don't have
+DETAIL_DESCRIPTION_WAIT_MS = int(os.getenv("DETAIL_DESCRIPTION_WAIT_MS", "5000"))
+# Scraped pages waiting for the writer; bounds memory if the DB is slow
+DETAIL_WRITE_QUEUE = int(os.getenv("DETAIL_WRITE_QUEUE", "100"))
+
+
+# -----------------------------
+# Page pool
+# -----------------------------
+
+class PagePool:
+    """
+    A fixed set of pages over a few browser contexts. Callers borrow a
+    page for one company; a page that broke is replaced before it goes
+    back into the pool.
+    """
+
+    def __init__(self, browser, size, contexts):
+        self.browser = browser
+        self.size = size
+        self.n_contexts = max(1, min(contexts, size))
+        self.contexts = []
+        # Crashed context -> the one that replaced it
+        self._replaced = {}
+        self._pages = asyncio.Queue()
+
+    async def start(self):
+        for _ in range(self.n_contexts):
+            self.contexts.append(await self._new_context())
+
+        for i in range(self.size):
+            context = self.contexts[i % self.n_contexts]
+            await self._pages.put((context, await self._new_page(context)))
+
+    async def _new_context(self):
+        context = await self.browser.new_context()
+        await context.route("**/*", _route_lean)
+        return context
+
+    async def _new_page(self, context):
+        page = await context.new_page()
+        page.set_default_timeout(DETAIL_TIMEOUT_MS)
+        return page
+
+    async def _fresh_page(self, context):
+        """
+        A new page for a slot, in a new context when the slot's context
+        is gone (e.g. it crashed). Slots sharing the dead context move to
+        the same replacement.
+        """
+        context = self._replaced.get(context, context)
+        try:
+            return context, await self._new_page(context)
+        except Exception:
+            replacement = await self._new_context()
+            self._replaced[context] = replacement
+            self.contexts = [replacement if c is context else c for c in self.contexts]
+            return replacement, await self._new_page(replacement)
+
+    async def acquire(self):
+        context, page = await self._pages.get()
+        if page is None:
+            # Lost on an earlier release; rebuild it now
+            try:
+                context, page = await self._fresh_page(context)
+            except Exception:
+                await self._pages.put((context, None))
+                raise
+        return context, page
+
+    async def release(self, context, page, broken=False):
+        """
+        Return a page to the pool. Never raises: a page that cannot be
+        replaced goes back as an empty slot for the next acquire().
+        """
+        if broken or page.is_closed():
+            try:
+                await page.close()
+            except Exception:
+                pass
+            try:
+                context, page = await self._fresh_page(context)
+            except Exception as e:
+                logger.warning(f"Could not replace a broken page: {e}")
+                page = None
+        await self._pages.put((context, page))
+
+    async def close(self):
+        for context in self.contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Could not close browser context: {e}")
+
+
+async def _route_lean(route):
+    if should_block(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class Browser:
+    """
+    Launches Chromium and the page pool on first use, so HTTP-only runs
+    never start a browser.
+    """
+
+    def __init__(self, playwright, size, contexts):
+        self.playwright = playwright
+        self.size = size
+        self.contexts = contexts
+        self.browser = None
+        self.pool = None
+        self._lock = asyncio.Lock()
+
+    async def get_pool(self):
+        async with self._lock:
+            if self.pool is None:
+                self.browser = await self.playwright.chromium.launch(headless=True)
+                self.pool = PagePool(self.browser, self.size, self.contexts)
+                await self.pool.start()
+        return self.pool
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+        if self.browser is not None:
+            await self.browser.close()
+
+
+# -----------------------------
+# Playwright scraper
+# -----------------------------
+
+async def scrape_company_page(page, slug):
+    url = f"https://www.ycombinator.com/companies/{slug}"
+
+    # Wait for what is read below rather than for the network to go
+    # idle: the header, the labeled details and (if the company has one)
+    # the description. Reading earlier than the sync scraper would store
+    # partial fields and change every snapshot hash.
+    await page.goto(url, wait_until="domcontentloaded")
+    await page.wait_for_selector("h1")
+    await page.wait_for_selector("text=Batch")
+    try:
+        await page.wait_for_selector("div[class*='prose']", timeout=DETAIL_DESCRIPTION_WAIT_MS)
+    except PlaywrightTimeoutError:
+        pass
+
+    async def text(selector):
+        el = await page.query_selector(selector)
+        return (await el.inner_text()).strip() if el else None
+
+    description = await text("div[class*='prose']")
+
+    async def labeled_value(label):
+        el = await page.query_selector(f"text={label}")
+        if not el:
+            return None
+        parent = await el.evaluate_handle("e => e.parentElement")
+        value_el = await parent.evaluate_handle(
+            "p => p.querySelector('span:last-child, div:last-child')"
+        )
+        value_el = value_el.as_element()
+        return (await value_el.inner_text()).strip() if value_el else None
+
+    batch = await labeled_value("Batch")
+    stage = await labeled_value("Status")
+    location = await labeled_value("Location")
+
+    tags = [
+        (await el.inner_text()).strip()
+        for el in await page.query_selector_all("a[href*='companies?tag']")
+    ]
+
+    return {
+        "batch": batch,
+        "stage": stage,
+        "description": description,
+        "location": location,
+        "tags": tags,
+        "employee_range": None
+    }
+
+
+async def fetch_company(browser, session, company, mode, retries, counts):
+    """
+    Embedded page JSON over pooled HTTP first (unless mode is "browser"),
+    then Playwright when the page carries no embedded data.
+    """
+    if mode != "browser":
+        data = await asyncio.to_thread(fetch_company_http, session, company["slug"])
+        if data is not None:
+            counts["via_http"] += 1
+            return data
+        if mode == "http":
+            logger.warning(f"{company['slug']}: no embedded company data")
+            return None
+
+    data = await scrape_with_retries(await browser.get_pool(), company, retries)
+    if data is not None:
+        counts["via_browser"] += 1
+    return data
+
+
+async def scrape_with_retries(pool, company, retries=DETAIL_RETRIES):
+    """
+    Scrape one company on a pooled page, retrying with backoff. Returns
+    the data dict, or None after the last failed attempt.
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            context, page = await pool.acquire()
+        except Exception as e:
+            logger.warning(f"{company['slug']}: attempt {attempt}/{retries}: no usable page: {e}")
+        else:
+            broken = False
+            try:
+                return await scrape_company_page(page, company["slug"])
+            except Exception as e:
+                broken = True
+                logger.warning(f"{company['slug']}: attempt {attempt}/{retries} failed: {e}")
+            finally:
+                await pool.release(context, page, broken=broken)
+
+        if attempt < retries:
+            await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+    return None
+
+
+# -----------------------------
+# DB writer
+# -----------------------------
+
+def write_snapshot(conn, company, data):
+    """
+    Insert a snapshot when the page changed. Runs on the writer thread;
+    returns "new" or "unchanged".
+    """
+    cur = conn.cursor()
+    try:
+        snapshot_hash = compute_snapshot_hash(data)
+        if get_latest_snapshot_hash(cur, company["id"]) == snapshot_hash:
+            # End the read; otherwise the writer sits idle in a transaction
+            conn.rollback()
+            return "unchanged"
+
+        cur.execute("""
+            INSERT INTO company_snapshots
+            (company_id, batch, stage, description, location,
+             tags, employee_range, scraped_at, snapshot_hash)
+            VALUES (%s,%s,%s,%s,%s,%s::jsonb,%s,clock_timestamp(),%s)
+        """, (
+            company["id"],
+            data["batch"],
+            data["stage"],
+            data["description"],
+            data["location"],
+            json.dumps(data["tags"]),
+            data["employee_range"],
+            snapshot_hash
+        ))
+        refresh_company_latest(cur, [company["id"]])
+
+        conn.commit()
+        return "new"
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+async def writer(conn, queue, counts):
+    """
+    Single consumer of scraped pages; DB calls run in a thread so the
+    event loop keeps driving the browser meanwhile.
+    """
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+
+        company, data = item
+        try:
+            outcome = await asyncio.to_thread(write_snapshot, conn, company, data)
+            counts[outcome] += 1
+        except Exception:
+            counts["failed"] += 1
+            logger.exception(f"Failed to save {company['slug']}")
+
+
+# -----------------------------
+# Main runner
+# -----------------------------
+
+async def run_async(limit=None, concurrency=DETAIL_CONCURRENCY, contexts=DETAIL_CONTEXTS,
+                    retries=DETAIL_RETRIES, write=True, mode=DETAIL_MODE):
+    start_time = time.time()
+
+    companies = get_companies(limit)
+    logger.info(f"Processing {len(companies)} companies with {concurrency} pages")
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+
+    scrape_run_id = None
+    if write:
+        ensure_projection_schema(cur)
+        cur.execute(
+            "INSERT INTO scrape_runs (started_at) VALUES (NOW()) RETURNING id"
+        )
+        scrape_run_id = cur.fetchone()[0]
+        conn.commit()
+
+    counts = {"new": 0, "unchanged": 0, "failed": 0, "scraped": 0, "via_http": 0, "via_browser": 0}
+    session = make_session(pool_size=concurrency)
+    write_queue = asyncio.Queue(maxsize=DETAIL_WRITE_QUEUE)
+    todo = asyncio.Queue()
+    for company in companies:
+        todo.put_nowait(company)
+
+    try:
+        async with async_playwright() as p:
+            browser = Browser(p, concurrency, contexts)
+
+            async def worker():
+                while True:
+                    try:
+                        company = todo.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+
+                    try:
+                        data = await fetch_company(browser, session, company, mode, retries, counts)
+                    except Exception as e:
+                        logger.warning(f"{company['slug']}: {e}")
+                        data = None
+
+                    if data is None:
+                        counts["failed"] += 1
+                        logger.error(f"Giving up on {company['slug']}")
+                        continue
+
+                    counts["scraped"] += 1
+                    if write:
+                        await write_queue.put((company, data))
+
+                    if counts["scraped"] % 100 == 0:
+                        rate = counts["scraped"] / (time.time() - start_time) * 60
+                        logger.info(f"{counts['scraped']}/{len(companies)} scraped ({rate:.0f}/min)")
+
+            writer_task = asyncio.create_task(writer(conn, write_queue, counts))
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # The writer always gets its sentinel, even if a worker failed
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await write_queue.put(None)
+                await writer_task
+
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.warning(f"Could not close the browser: {e}")
+    finally:
+        elapsed = time.time() - start_time
+        avg_ms = (elapsed / max(len(companies), 1)) * 1000
+
+        # Close the run even when scraping failed part way
+        if write:
+            cur.execute("""
+                UPDATE scrape_runs
+                SET ended_at = NOW(),
+                    total_companies = %s,
+                    new_companies = %s,
+                    unchanged_companies = %s,
+                    failed_companies = %s,
+                    avg_time_per_company_ms = %s
+                WHERE id = %s
+            """, (
+                len(companies),
+                counts["new"],
+                counts["unchanged"],
+                counts["failed"],
+                avg_ms,
+                scrape_run_id
+            ))
+            conn.commit()
+
+        cur.close()
+        conn.close()
+
+    per_minute = len(companies) / elapsed * 60 if elapsed else 0
+    logger.info("Async detail scraping completed")
+    logger.info(f"New snapshots: {counts['new']}")
+    logger.info(f"Unchanged: {counts['unchanged']}")
+    logger.info(f"Failed: {counts['failed']}")
+    logger.info(f"Via HTTP: {counts['via_http']}, via browser: {counts['via_browser']}")
+    logger.info(f"Runtime: {elapsed:.2f}s ({per_minute:.0f} companies/min)")
+
+    return {"mode": mode, "concurrency": concurrency, "elapsed_s": elapsed, "per_minute": per_minute, **counts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[DETAIL_CONCURRENCY],
+        help="one run per value, e.g. --concurrency 1 4 8 16"
+    )
+    parser.add_argument("--contexts", type=int, default=DETAIL_CONTEXTS)
+    parser.add_argument("--retries", type=int, default=DETAIL_RETRIES)
+    parser.add_argument("--mode", choices=DETAIL_MODES, default=DETAIL_MODE)
+    parser.add_argument("--no-write", action="store_true", help="scrape only; skip snapshot writes")
+    args = parser.parse_args()
+
+    results = [
+        asyncio.run(run_async(
+            args.limit, c, args.contexts, args.retries,
+            write=not args.no_write, mode=args.mode
+        ))
+        for c in args.concurrency
+    ]
+
+    print(f"\n{'pages':>6} {'companies/min':>14} {'failed':>7} {'runtime_s':>10}")
+    for r in results:
+        print(f"{r['concurrency']:>6} {r['per_minute']:>14.1f} {r['failed']:>7} {r['elapsed_s']:>10.1f}")
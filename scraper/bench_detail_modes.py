@@ -0,0 +1,110 @@
+"""
+Detail-page extraction benchmark: embedded page JSON over pooled HTTP
+versus the Playwright browser path, on the same companies. Nothing is
+written to the database.
+
+    python scraper/bench_detail_modes.py --limit 100 --concurrency 8
+"""
+import time
+import asyncio
+import argparse
+
+from playwright.async_api import async_playwright
+
+from detail_http import make_session, fetch_company_http
+from html_detail_scraper import get_companies
+from async_detail_scraper import Browser, scrape_with_retries
+
+FIELDS = ("batch", "stage", "description", "location", "tags")
+
+
+async def bench_http(companies, concurrency):
+    session = make_session(pool_size=concurrency)
+    limit = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def one(company):
+        async with limit:
+            try:
+                results[company["id"]] = await asyncio.to_thread(
+                    fetch_company_http, session, company["slug"]
+                )
+            except Exception:
+                results[company["id"]] = None
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(c) for c in companies))
+    return results, time.perf_counter() - t0
+
+
+async def bench_browser(companies, concurrency, contexts):
+    limit = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async with async_playwright() as p:
+        browser = Browser(p, concurrency, contexts)
+        # Launch outside the timed section, as a long run amortizes it
+        pool = await browser.get_pool()
+
+        async def one(company):
+            async with limit:
+                results[company["id"]] = await scrape_with_retries(pool, company)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(c) for c in companies))
+        elapsed = time.perf_counter() - t0
+
+        await browser.close()
+
+    return results, elapsed
+
+
+def report(label, results, elapsed):
+    ok = sum(1 for r in results.values() if r is not None)
+    print(
+        f"{label:<10} {len(results) / elapsed * 60:>14.1f} "
+        f"{ok:>6}/{len(results):<6} {elapsed:>10.1f}"
+    )
+
+
+def compare(http, browser):
+    both = [cid for cid in http if http[cid] is not None and browser.get(cid) is not None]
+    if not both:
+        return
+
+    print(f"\nField agreement on {len(both)} companies scraped by both modes:")
+    for field in FIELDS:
+        same = sum(1 for cid in both if _norm(http[cid][field]) == _norm(browser[cid][field]))
+        print(f"  {field:<12} {same / len(both):>6.1%}")
+
+
+def _norm(value):
+    if isinstance(value, list):
+        return sorted(str(v).strip().lower() for v in value)
+    return " ".join(str(value).split()).lower() if value else None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--contexts", type=int, default=2)
+    args = parser.parse_args()
+
+    companies = get_companies(args.limit)
+    print(f"{len(companies)} companies, concurrency {args.concurrency}\n")
+    print(f"{'mode':<10} {'companies/min':>14} {'ok':>13} {'runtime_s':>10}")
+
+    http, http_s = await bench_http(companies, args.concurrency)
+    report("http", http, http_s)
+
+    browser, browser_s = await bench_browser(companies, args.concurrency, args.contexts)
+    report("browser", browser, browser_s)
+
+    missing = sum(1 for r in http.values() if r is None)
+    print(f"\nHTTP mode would fall back to the browser for {missing} companies")
+    compare(http, browser)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import re
+import json
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from html_list_scraper import BASE_URL, HEADERS
+
+logger = logging.getLogger(__name__)
+
+# Cheaper than building a soup for one script tag
+NEXT_DATA_RE = re.compile(
+    r'<script id="__NEXT_DATA__" type="application/json"[^>]*>(.*?)</script>',
+    re.DOTALL
+)
+
+
+def make_session(pool_size=10):
+    """
+    requests.Session with a keep-alive pool sized for `pool_size` threads
+    and retries on throttling / server errors.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def extract_next_data(html: str):
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_company(next_data: dict):
+    """
+    Map the page's embedded company record onto the dict shape
+    scrape_company_page returns; None when the record is missing.
+    """
+    company = (
+        next_data.get("props", {})
+            .get("pageProps", {})
+            .get("company")
+    )
+    if not company:
+        return None
+
+    description = (
+        company.get("long_description")
+        or company.get("description")
+        or company.get("one_liner")
+    )
+    tags = [
+        t.get("name") if isinstance(t, dict) else t
+        for t in company.get("tags") or []
+    ]
+
+    return {
+        "batch": company.get("batch_name") or company.get("batch"),
+        "stage": company.get("status") or company.get("stage"),
+        "description": description.strip() if description else None,
+        "location": company.get("location") or company.get("all_locations"),
+        "tags": [t for t in tags if t],
+        # The browser path never fills this either; keeping it None keeps
+        # snapshot hashes comparable between the two modes
+        "employee_range": None
+    }
+
+
+def fetch_company_http(session, slug, timeout=30):
+    """
+    Company details from the embedded page JSON, or None when the page
+    has no usable embedded data (the caller falls back to the browser).
+    HTTP errors are raised.
+    """
+    resp = session.get(f"{BASE_URL}/companies/{slug}", timeout=timeout)
+    resp.raise_for_status()
+
+    next_data = extract_next_data(resp.text)
+    if next_data is None:
+        return None
+    return parse_company(next_data)
@@ -1,58 +1,155 @@
 import os
+import time
+import argparse
+from datetime import timedelta
+
 import psycopg2
 from dotenv import load_dotenv
 
+from projections import ensure_projection_schema, record_change_counts
+
 load_dotenv()
 DB_URL = os.getenv("DATABASE_URL")
 
 FIELDS = ["batch", "stage", "location", "description"]
 
-def detect_changes():
+# Writers stamp snapshots with clock_timestamp() and commit right after,
+# but a snapshot can still commit after a run that has passed its
+# scraped_at. Each run rescans this far behind the watermark; the unique
+# index drops repeats.
+CHANGE_DETECTION_OVERLAP_S = int(os.getenv("CHANGE_DETECTION_OVERLAP_S", "600"))
+
+CURRENT_FIELDS = ", ".join(f"s.{field}" for field in FIELDS)
+LAGGED_FIELDS = ", ".join(f"LAG(s.{field}) OVER w AS prev_{field}" for field in FIELDS)
+FIELD_PAIRS = ",\n".join(
+    f"('{field.upper()}_CHANGE', prev_{field}, {field})" for field in FIELDS
+)
+
+# Every consecutive snapshot pair of the affected companies whose newer
+# side falls in (since, until], one row per changed field
+DETECT_SQL = f"""
+    WITH affected AS (
+        SELECT DISTINCT company_id
+        FROM company_snapshots
+        WHERE scraped_at > %(since)s AND scraped_at <= %(until)s
+    ),
+    ordered AS (
+        SELECT
+            s.company_id,
+            s.scraped_at,
+            {CURRENT_FIELDS},
+            LAG(s.scraped_at) OVER w AS prev_scraped_at,
+            {LAGGED_FIELDS}
+        FROM company_snapshots s
+        JOIN affected a ON a.company_id = s.company_id
+        WHERE s.scraped_at <= %(until)s
+        WINDOW w AS (PARTITION BY s.company_id ORDER BY s.scraped_at)
+    ),
+    changes AS (
+        -- 'None' matches how missing values have always been recorded
+        SELECT o.company_id, o.scraped_at, f.change_type,
+               COALESCE(f.old_value, 'None') AS old_value,
+               COALESCE(f.new_value, 'None') AS new_value
+        FROM ordered o
+        CROSS JOIN LATERAL (VALUES
+            {FIELD_PAIRS}
+        ) AS f(change_type, old_value, new_value)
+        WHERE o.scraped_at > %(since)s
+          AND o.prev_scraped_at IS NOT NULL
+          AND f.old_value IS DISTINCT FROM f.new_value
+    )
+    INSERT INTO company_changes
+    (company_id, change_type, old_value, new_value, snapshot_scraped_at)
+    SELECT ch.company_id, ch.change_type, ch.old_value, ch.new_value, ch.scraped_at
+    FROM changes ch
+    -- Rows recorded before snapshot_scraped_at existed. Only snapshots
+    -- older than such a row can be the one it recorded; a later repeat
+    -- of the same transition (A->B, B->A, A->B) is a new change.
+    WHERE NOT EXISTS (
+        SELECT 1 FROM company_changes l
+        WHERE l.company_id = ch.company_id
+          AND l.change_type = ch.change_type
+          AND l.snapshot_scraped_at IS NULL
+          AND l.old_value = ch.old_value
+          AND l.new_value = ch.new_value
+          AND ch.scraped_at <= l.detected_at
+    )
+    ORDER BY ch.company_id, ch.scraped_at
+    ON CONFLICT (company_id, change_type, snapshot_scraped_at) DO NOTHING
+    RETURNING change_type
+"""
+
+
+def ensure_change_detection_schema(cur):
+    cur.execute("""
+        ALTER TABLE company_changes
+            ADD COLUMN IF NOT EXISTS snapshot_scraped_at TIMESTAMPTZ;
+
+        -- One change per field per snapshot, however often a range is rescanned
+        CREATE UNIQUE INDEX IF NOT EXISTS company_changes_snapshot_uidx
+            ON company_changes (company_id, change_type, snapshot_scraped_at);
+
+        -- Finds the snapshots past the watermark without a full scan
+        CREATE INDEX IF NOT EXISTS company_snapshots_scraped_idx
+            ON company_snapshots (scraped_at);
+
+        CREATE TABLE IF NOT EXISTS change_detection_state (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            last_scraped_at TIMESTAMPTZ
+        );
+    """)
+
+
+def detect_changes(full=False):
+    start = time.time()
     conn = psycopg2.connect(DB_URL)
     cur = conn.cursor()
 
+    ensure_projection_schema(cur)
+    ensure_change_detection_schema(cur)
+    conn.commit()
+
+    # Serializes concurrent runs, which would otherwise race on the watermark
     cur.execute("""
-        SELECT company_id
-        FROM company_snapshots
-        GROUP BY company_id
-        HAVING COUNT(*) >= 2
+        INSERT INTO change_detection_state (id) VALUES (TRUE)
+        ON CONFLICT (id) DO NOTHING
     """)
-    company_ids = [r[0] for r in cur.fetchall()]
-
-    print(f"Checking {len(company_ids)} companies for changes")
-
-    for company_id in company_ids:
-        cur.execute("""
-            SELECT batch, stage, location, description, tags
-            FROM company_snapshots
-            WHERE company_id = %s
-            ORDER BY scraped_at DESC
-            LIMIT 2
-        """, (company_id,))
-
-        latest, previous = cur.fetchall()
-
-        for idx, field in enumerate(FIELDS):
-            old = previous[idx]
-            new = latest[idx]
-
-            if old != new:
-                cur.execute("""
-                    INSERT INTO company_changes
-                    (company_id, change_type, old_value, new_value)
-                    VALUES (%s, %s, %s, %s)
-                """, (
-                    company_id,
-                    f"{field.upper()}_CHANGE",
-                    str(old),
-                    str(new)
-                ))
+    cur.execute("SELECT last_scraped_at FROM change_detection_state FOR UPDATE")
+    watermark = None if full else cur.fetchone()[0]
 
+    cur.execute("SELECT MAX(scraped_at) FROM company_snapshots")
+    until = cur.fetchone()[0]
+
+    if until is None:
+        conn.rollback()
+        cur.close()
+        conn.close()
+        print("No snapshots to check")
+        return
+
+    since = watermark - timedelta(seconds=CHANGE_DETECTION_OVERLAP_S) if watermark else None
+    print(f"Checking snapshots after {since or 'the beginning'} up to {until}")
+
+    cur.execute(DETECT_SQL, {
+        "since": since or "-infinity",
+        "until": until,
+    })
+    inserted_types = [r[0] for r in cur.fetchall()]
+
+    record_change_counts(cur, inserted_types)
+    cur.execute(
+        "UPDATE change_detection_state SET last_scraped_at = GREATEST(last_scraped_at, %s)",
+        (until,)
+    )
     conn.commit()
     cur.close()
     conn.close()
 
-    print("✓ Change detection completed")
+    print(f"✓ Change detection completed: {len(inserted_types)} new changes in {time.time() - start:.2f}s")
 
 if __name__ == "__main__":
-    detect_changes()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="rescan all snapshot history, ignoring the watermark")
+    args = parser.parse_args()
+
+    detect_changes(full=args.full)
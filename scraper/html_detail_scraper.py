@@ -3,12 +3,17 @@ import time
 import json
 import hashlib
 import logging
+import argparse
 from datetime import datetime
+from urllib.parse import urlparse
 
 import psycopg2
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
 
+from projections import ensure_projection_schema, refresh_company_latest
+from detail_http import make_session, fetch_company_http
+
 # -----------------------------
 # Config & Logging
 # -----------------------------
@@ -27,6 +32,28 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# "http": embedded page JSON only, "browser": Playwright only,
+# "auto": JSON first, Playwright when the page has no embedded data.
+# Browser stays the default until bench_detail_modes.py shows the JSON
+# fields agree with the DOM ones; any mismatch changes every snapshot hash.
+DETAIL_MODE = os.getenv("DETAIL_MODE", "browser")
+DETAIL_MODES = ("auto", "http", "browser")
+
+# Nothing the detail selectors need; skipped when the browser is used
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "hotjar.com",
+    "facebook.net",
+    "intercom.io",
+    "sentry.io",
+)
+
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -84,6 +111,22 @@ def get_latest_snapshot_hash(cur, company_id):
 # Playwright scraper
 # -----------------------------
 
+def should_block(request) -> bool:
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request.url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in BLOCKED_HOSTS)
+
+
+def new_lean_page(browser):
+    page = browser.new_page()
+    page.route(
+        "**/*",
+        lambda route: route.abort() if should_block(route.request) else route.continue_()
+    )
+    return page
+
+
 def scrape_company_page(page, slug):
     url = f"https://www.ycombinator.com/companies/{slug}"
     logger.info(f"Opening {url}")
@@ -133,7 +176,7 @@ def scrape_company_page(page, slug):
 # Main runner
 # -----------------------------
 
-def run(limit=10):
+def run(limit=10, mode=DETAIL_MODE):
     start_time = time.time()
 
     companies = get_companies(limit)
@@ -142,6 +185,9 @@ def run(limit=10):
     conn = get_db_conn()
     cur = conn.cursor()
 
+    ensure_projection_schema(cur)
+    conn.commit()
+
     # scrape_runs start
     cur.execute(
         "INSERT INTO scrape_runs (started_at) VALUES (NOW()) RETURNING id"
@@ -150,20 +196,33 @@ def run(limit=10):
     conn.commit()
 
     new_snapshots = unchanged = failed = 0
+    session = make_session(pool_size=1)
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = page = None
 
         for idx, company in enumerate(companies, 1):
             try:
                 logger.info(f"[{idx}/{len(companies)}] {company['slug']}")
 
-                data = scrape_company_page(page, company["slug"])
+                data = None
+                if mode != "browser":
+                    data = fetch_company_http(session, company["slug"])
+                if data is None:
+                    if mode == "http":
+                        raise RuntimeError("no embedded company data")
+                    if page is None:
+                        # Only started once a page actually needs it
+                        browser = p.chromium.launch(headless=True)
+                        page = new_lean_page(browser)
+                    data = scrape_company_page(page, company["slug"])
                 snapshot_hash = compute_snapshot_hash(data)
                 latest_hash = get_latest_snapshot_hash(cur, company["id"])
 
                 if latest_hash == snapshot_hash:
+                    # End the read so the connection isn't left idle in a
+                    # transaction across the run
+                    conn.rollback()
                     unchanged += 1
                     continue
 
@@ -171,7 +230,7 @@ def run(limit=10):
                     INSERT INTO company_snapshots
                     (company_id, batch, stage, description, location,
                      tags, employee_range, scraped_at, snapshot_hash)
-                    VALUES (%s,%s,%s,%s,%s,%s::jsonb,%s,NOW(),%s)
+                    VALUES (%s,%s,%s,%s,%s,%s::jsonb,%s,clock_timestamp(),%s)
                 """, (
                     company["id"],
                     data["batch"],
@@ -182,6 +241,7 @@ def run(limit=10):
                     data["employee_range"],
                     snapshot_hash
                 ))
+                refresh_company_latest(cur, [company["id"]])
 
                 conn.commit()
                 new_snapshots += 1
@@ -193,7 +253,8 @@ def run(limit=10):
 
             time.sleep(0.4)
 
-        browser.close()
+        if browser is not None:
+            browser.close()
 
     elapsed = time.time() - start_time
     avg_ms = (elapsed / max(len(companies), 1)) * 1000
@@ -228,4 +289,9 @@ def run(limit=10):
 
 
 if __name__ == "__main__":
-    run(limit=10)   # increase gradually → run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=10)   # increase gradually
+    parser.add_argument("--mode", choices=DETAIL_MODES, default=DETAIL_MODE)
+    args = parser.parse_args()
+
+    run(limit=args.limit, mode=args.mode)
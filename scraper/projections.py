@@ -0,0 +1,278 @@
+import os
+import time
+import logging
+
+import psycopg2
+from dotenv import load_dotenv
+
+# -----------------------------
+# Read-side projections
+# -----------------------------
+#
+# company_latest holds exactly one row per company: its most recent
+# snapshot. Scrapers refresh it in the same transaction that inserts a
+# snapshot, so readers never need DISTINCT ON over the full history.
+#
+# The trend_* rollups count companies by their latest snapshot (tags,
+# location) and changes by type. They are adjusted by deltas whenever
+# company_latest moves or changes are recorded.
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+DATABASE_URL = os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
+
+LATEST_COLUMNS = """
+    company_id,
+    batch,
+    stage,
+    description,
+    location,
+    tags,
+    employee_range,
+    scraped_at,
+    snapshot_hash,
+    search_vector
+"""
+
+
+def ensure_projection_schema(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS company_latest (
+            company_id INTEGER PRIMARY KEY
+                REFERENCES companies(id) ON DELETE CASCADE,
+            batch TEXT,
+            stage TEXT,
+            description TEXT,
+            location TEXT,
+            tags JSONB,
+            employee_range TEXT,
+            scraped_at TIMESTAMPTZ,
+            snapshot_hash TEXT,
+            search_vector TSVECTOR
+        );
+
+        CREATE INDEX IF NOT EXISTS company_latest_search_vector_idx
+            ON company_latest USING GIN (search_vector);
+
+        CREATE INDEX IF NOT EXISTS company_latest_tags_idx
+            ON company_latest USING GIN (tags);
+
+        CREATE INDEX IF NOT EXISTS company_latest_batch_idx
+            ON company_latest (batch);
+
+        CREATE TABLE IF NOT EXISTS trend_tag_counts (
+            tag TEXT PRIMARY KEY,
+            company_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS trend_location_counts (
+            location TEXT PRIMARY KEY,
+            company_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS trend_change_type_counts (
+            change_type TEXT PRIMARY KEY,
+            change_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- Keyset pagination of /api/companies
+        CREATE INDEX IF NOT EXISTS companies_name_id_idx
+            ON companies (name, id);
+
+        -- Serves "latest snapshot for these companies" lookups
+        CREATE INDEX IF NOT EXISTS company_snapshots_company_scraped_idx
+            ON company_snapshots (company_id, scraped_at DESC);
+
+        -- Bumped whenever the projections change; part of the API's
+        -- data version, so cached responses and ETags move with it
+        CREATE TABLE IF NOT EXISTS projection_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 0
+        );
+
+        INSERT INTO projection_version (id) VALUES (TRUE)
+        ON CONFLICT (id) DO NOTHING;
+    """)
+
+    # Freshly created (or never filled) projections are only ever moved
+    # by deltas, so fill them once from the source tables
+    cur.execute("""
+        SELECT
+            NOT EXISTS (SELECT 1 FROM company_latest)
+                AND EXISTS (SELECT 1 FROM company_snapshots),
+            NOT EXISTS (SELECT 1 FROM trend_tag_counts)
+                AND NOT EXISTS (SELECT 1 FROM trend_location_counts)
+                AND NOT EXISTS (SELECT 1 FROM trend_change_type_counts)
+    """)
+    latest_empty, rollups_empty = cur.fetchone()
+
+    if latest_empty:
+        logger.info("company_latest is empty; building it from company_snapshots")
+        rebuild_company_latest(cur)
+    if latest_empty or rollups_empty:
+        rebuild_rollups(cur)
+        bump_projection_version(cur)
+
+
+def bump_projection_version(cur):
+    cur.execute("UPDATE projection_version SET version = version + 1")
+
+
+def _apply_rollup_delta(cur, company_ids, sign):
+    """
+    Add (sign=1) or remove (sign=-1) the given companies' current
+    company_latest rows from the tag and location rollups.
+    """
+    cur.execute("""
+        INSERT INTO trend_tag_counts (tag, company_count)
+        SELECT tag, %s * COUNT(DISTINCT cl.company_id)
+        FROM company_latest cl,
+             LATERAL jsonb_array_elements_text(cl.tags) AS tag
+        WHERE cl.company_id = ANY(%s)
+        GROUP BY tag
+        ORDER BY tag
+        ON CONFLICT (tag) DO UPDATE SET
+            company_count = trend_tag_counts.company_count + EXCLUDED.company_count
+    """, (sign, company_ids))
+
+    cur.execute("""
+        INSERT INTO trend_location_counts (location, company_count)
+        SELECT location, %s * COUNT(*)
+        FROM company_latest
+        WHERE company_id = ANY(%s)
+          AND location IS NOT NULL
+        GROUP BY location
+        ORDER BY location
+        ON CONFLICT (location) DO UPDATE SET
+            company_count = trend_location_counts.company_count + EXCLUDED.company_count
+    """, (sign, company_ids))
+
+
+def refresh_company_latest(cur, company_ids):
+    """
+    Re-point company_latest at the newest snapshot of each given company
+    and move the trend rollups along with it. Call after inserting
+    snapshots, inside the same transaction.
+    """
+    if not company_ids:
+        return
+
+    company_ids = list(company_ids)
+
+    # Serialize concurrent refreshes of the same companies
+    cur.execute("""
+        SELECT company_id FROM company_latest
+        WHERE company_id = ANY(%s)
+        ORDER BY company_id
+        FOR UPDATE
+    """, (company_ids,))
+
+    _apply_rollup_delta(cur, company_ids, -1)
+
+    cur.execute(f"""
+        INSERT INTO company_latest ({LATEST_COLUMNS})
+        SELECT DISTINCT ON (company_id) {LATEST_COLUMNS}
+        FROM company_snapshots
+        WHERE company_id = ANY(%s)
+        ORDER BY company_id, scraped_at DESC
+        ON CONFLICT (company_id) DO UPDATE SET
+            batch = EXCLUDED.batch,
+            stage = EXCLUDED.stage,
+            description = EXCLUDED.description,
+            location = EXCLUDED.location,
+            tags = EXCLUDED.tags,
+            employee_range = EXCLUDED.employee_range,
+            scraped_at = EXCLUDED.scraped_at,
+            snapshot_hash = EXCLUDED.snapshot_hash,
+            search_vector = EXCLUDED.search_vector
+    """, (company_ids,))
+
+    _apply_rollup_delta(cur, company_ids, 1)
+
+    cur.execute("DELETE FROM trend_tag_counts WHERE company_count <= 0")
+    cur.execute("DELETE FROM trend_location_counts WHERE company_count <= 0")
+
+    bump_projection_version(cur)
+
+
+def record_change_counts(cur, change_types):
+    """
+    Bump trend_change_type_counts for newly inserted company_changes rows.
+    """
+    counts = {}
+    for change_type in change_types:
+        counts[change_type] = counts.get(change_type, 0) + 1
+
+    for change_type, count in sorted(counts.items()):
+        cur.execute("""
+            INSERT INTO trend_change_type_counts (change_type, change_count)
+            VALUES (%s, %s)
+            ON CONFLICT (change_type) DO UPDATE SET
+                change_count = trend_change_type_counts.change_count + EXCLUDED.change_count
+        """, (change_type, count))
+
+
+def rebuild_company_latest(cur):
+    cur.execute("TRUNCATE company_latest")
+    cur.execute(f"""
+        INSERT INTO company_latest ({LATEST_COLUMNS})
+        SELECT DISTINCT ON (company_id) {LATEST_COLUMNS}
+        FROM company_snapshots
+        ORDER BY company_id, scraped_at DESC
+    """)
+
+
+def rebuild_rollups(cur):
+    cur.execute("TRUNCATE trend_tag_counts, trend_location_counts, trend_change_type_counts")
+
+    cur.execute("""
+        INSERT INTO trend_tag_counts (tag, company_count)
+        SELECT tag, COUNT(DISTINCT cl.company_id)
+        FROM company_latest cl,
+             LATERAL jsonb_array_elements_text(cl.tags) AS tag
+        GROUP BY tag
+    """)
+
+    cur.execute("""
+        INSERT INTO trend_location_counts (location, company_count)
+        SELECT location, COUNT(*)
+        FROM company_latest
+        WHERE location IS NOT NULL
+        GROUP BY location
+    """)
+
+    cur.execute("""
+        INSERT INTO trend_change_type_counts (change_type, change_count)
+        SELECT change_type, COUNT(*)
+        FROM company_changes
+        GROUP BY change_type
+    """)
+
+
+def rebuild_projections():
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL not set")
+
+    start = time.time()
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+
+    ensure_projection_schema(cur)
+    rebuild_company_latest(cur)
+    rebuild_rollups(cur)
+    bump_projection_version(cur)
+    conn.commit()
+
+    cur.execute("SELECT COUNT(*) FROM company_latest")
+    count = cur.fetchone()[0]
+
+    cur.close()
+    conn.close()
+
+    logger.info(f"Rebuilt company_latest and trend rollups ({count} companies) in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    rebuild_projections()
@@ -1,15 +1,21 @@
 import os
+import sys
 import json
 import time
 import hashlib
 import logging
+import argparse
+import threading
+import queue
 from datetime import datetime
 
 import requests
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
 
+from projections import ensure_projection_schema, refresh_company_latest
+
 # -----------------------------
 # Config & Logging
 # -----------------------------
@@ -29,6 +35,13 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 YC_ALL_COMPANIES_URL = "https://yc-oss.github.io/api/companies/all.json"
 
+# Companies upserted / snapshotted per statement in bulk mode
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "500"))
+# Parsed batches waiting for the writer; bounds memory if the DB is slow
+SEED_QUEUE_BATCHES = int(os.getenv("SEED_QUEUE_BATCHES", "4"))
+# Local copy of all.json to read instead of downloading it
+SEED_SOURCE = os.getenv("SEED_SOURCE")
+
 
 # -----------------------------
 # Utils
@@ -72,7 +85,79 @@ def fetch_all_companies():
     return companies
 
 
-def upsert_company(cur, company):
+def iter_companies(source=None):
+    """
+    Yield feed entries one at a time from a local copy of all.json, or
+    from the response body as it downloads. With ijson only the current
+    entry and the parser's buffer are held in memory; without it the
+    feed is parsed whole with json.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+        logger.warning("ijson not installed; parsing the whole feed in memory")
+
+    def parse(f):
+        if ijson is None:
+            return iter(json.load(f))
+        return ijson.items(f, "item", use_float=True)
+
+    if source:
+        logger.info(f"Streaming YC companies from {source}")
+        with open(source, "rb") as f:
+            yield from parse(f)
+        return
+
+    logger.info("Streaming all YC companies from YC-OSS API")
+    with requests.get(YC_ALL_COMPANIES_URL, timeout=30, stream=True) as resp:
+        resp.raise_for_status()
+        # Undo gzip/deflate transfer encoding on the raw socket stream
+        resp.raw.decode_content = True
+        yield from parse(resp.raw)
+
+
+def iter_batches(companies, batch_size):
+    batch = []
+    for company in companies:
+        batch.append(company)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+UPSERT_COMPANIES_SQL = """
+    INSERT INTO companies
+    (yc_company_id, name, domain, founded_year, first_seen_at, last_seen_at, is_active)
+    VALUES %s
+    ON CONFLICT (yc_company_id)
+    DO UPDATE SET
+        name = EXCLUDED.name,
+        domain = EXCLUDED.domain,
+        founded_year = EXCLUDED.founded_year,
+        last_seen_at = NOW(),
+        is_active = TRUE
+    RETURNING id, yc_company_id;
+"""
+COMPANY_TEMPLATE = "(%s, %s, %s, %s, NOW(), NOW(), TRUE)"
+
+INSERT_SNAPSHOTS_SQL = """
+    INSERT INTO company_snapshots
+    (company_id, batch, stage, description, location, tags, employee_range, scraped_at, snapshot_hash)
+    VALUES %s;
+"""
+# clock_timestamp(), not NOW(): scraped_at should track when the row was
+# written, not when a long transaction began (detect_changes relies on it)
+SNAPSHOT_TEMPLATE = "(%s, %s, %s, %s, %s, %s::jsonb, %s, clock_timestamp(), %s)"
+
+
+def company_row(company):
+    """
+    (slug, name, domain, founded_year) for the companies upsert, or None
+    for feed entries without a slug.
+    """
     slug = company.get("slug")
     if not slug:
         return None
@@ -80,23 +165,15 @@ def upsert_company(cur, company):
     name = safe_text(company.get("name") or slug)
     website = company.get("website") or company.get("url")
     founded_year = company.get("year") or company.get("founded_year")
+    return slug, name, website, founded_year
 
-    cur.execute(
-        """
-        INSERT INTO companies
-        (yc_company_id, name, domain, founded_year, first_seen_at, last_seen_at, is_active)
-        VALUES (%s, %s, %s, %s, NOW(), NOW(), TRUE)
-        ON CONFLICT (yc_company_id)
-        DO UPDATE SET
-            name = EXCLUDED.name,
-            domain = EXCLUDED.domain,
-            founded_year = EXCLUDED.founded_year,
-            last_seen_at = NOW(),
-            is_active = TRUE
-        RETURNING id;
-        """,
-        (slug, name, website, founded_year),
-    )
+
+def upsert_company(cur, company):
+    row = company_row(company)
+    if row is None:
+        return None
+
+    cur.execute(UPSERT_COMPANIES_SQL % COMPANY_TEMPLATE, row)
     return cur.fetchone()["id"]
 
 
@@ -115,7 +192,10 @@ def get_latest_snapshot_hash(cur, company_id):
     return row["snapshot_hash"] if row else None
 
 
-def insert_snapshot_if_changed(cur, company_id, company):
+def build_snapshot(company):
+    """
+    (snapshot_data, snapshot_hash) for one feed entry.
+    """
     batch = company.get("batch") or company.get("demo_day_batch")
     stage = company.get("status") or "Active"
     description = safe_text(
@@ -147,46 +227,150 @@ def insert_snapshot_if_changed(cur, company_id, company):
         "employee_range": employee_range,
     }
 
-    snapshot_hash = compute_snapshot_hash(snapshot_data)
+    return snapshot_data, compute_snapshot_hash(snapshot_data)
+
+
+def snapshot_row(company_id, snapshot_data, snapshot_hash):
+    return (
+        company_id,
+        snapshot_data["batch"],
+        snapshot_data["stage"],
+        snapshot_data["description"],
+        snapshot_data["location"],
+        json.dumps(snapshot_data["tags"]),
+        snapshot_data["employee_range"],
+        snapshot_hash,
+    )
+
+
+def insert_snapshot_if_changed(cur, company_id, company):
+    snapshot_data, snapshot_hash = build_snapshot(company)
     latest_hash = get_latest_snapshot_hash(cur, company_id)
 
     if latest_hash == snapshot_hash:
         return False
 
     cur.execute(
-        """
-        INSERT INTO company_snapshots
-        (company_id, batch, stage, description, location, tags, employee_range, scraped_at, snapshot_hash)
-        VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s, NOW(), %s);
-        """,
-        (
-            company_id,
-            snapshot_data["batch"],
-            snapshot_data["stage"],
-            snapshot_data["description"],
-            snapshot_data["location"],
-            json.dumps(snapshot_data["tags"]),
-            snapshot_data["employee_range"],
-            snapshot_hash,
-        ),
+        INSERT_SNAPSHOTS_SQL % SNAPSHOT_TEMPLATE,
+        snapshot_row(company_id, snapshot_data, snapshot_hash),
     )
+    refresh_company_latest(cur, [company_id])
     return True
 
 
-def seed_from_yc_api():
-    start_time = time.time()
-    companies = fetch_all_companies()
-
-    conn = get_db_conn()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+# -----------------------------
+# Bulk mode
+# -----------------------------
 
-    # scrape_runs start
+def prefetch_latest_hashes(cur):
+    """
+    {slug: latest snapshot_hash} for every company with a snapshot, in
+    one query. Read from company_snapshots, like the row-by-row path,
+    since company_latest may not have been built yet.
+    """
     cur.execute(
-        "INSERT INTO scrape_runs (started_at) VALUES (NOW()) RETURNING id;"
+        """
+        SELECT DISTINCT ON (s.company_id) c.yc_company_id, s.snapshot_hash
+        FROM company_snapshots s
+        JOIN companies c ON c.id = s.company_id
+        ORDER BY s.company_id, s.scraped_at DESC;
+        """
     )
-    scrape_run_id = cur.fetchone()["id"]
-    conn.commit()
+    return {r["yc_company_id"]: r["snapshot_hash"] for r in cur.fetchall()}
+
 
+class BulkSeeder:
+    """
+    Writes feed entries in batches: one upsert for the batch's companies,
+    one insert for its changed snapshots and one company_latest refresh,
+    committed together. A batch that fails is replayed row by row so a
+    bad entry costs only itself, and counts match the row-by-row path.
+    """
+
+    def __init__(self, conn, cur):
+        self.conn = conn
+        self.cur = cur
+        self.latest_hashes = prefetch_latest_hashes(cur)
+        self.total = self.new_snapshots = self.unchanged = self.failed = 0
+
+    def write(self, companies):
+        try:
+            self._write_batch(companies)
+        except Exception:
+            self.conn.rollback()
+            logger.exception(f"Batch of {len(companies)} failed; retrying row by row")
+            self._write_rows(companies)
+
+    def _write_batch(self, companies):
+        # One row per slug: ON CONFLICT cannot touch a row twice per statement
+        rows = {}
+        snapshots = {}
+        entries = 0
+        for company in companies:
+            row = company_row(company)
+            if row is None:
+                continue
+            entries += 1
+            rows[row[0]] = row
+            snapshots[row[0]] = build_snapshot(company)
+
+        if not rows:
+            return
+
+        returned = execute_values(
+            self.cur, UPSERT_COMPANIES_SQL, list(rows.values()),
+            template=COMPANY_TEMPLATE, page_size=len(rows), fetch=True
+        )
+        ids = {r["yc_company_id"]: r["id"] for r in returned}
+
+        changed = [
+            (ids[slug], slug, data, snapshot_hash)
+            for slug, (data, snapshot_hash) in snapshots.items()
+            if self.latest_hashes.get(slug) != snapshot_hash
+        ]
+
+        if changed:
+            execute_values(
+                self.cur, INSERT_SNAPSHOTS_SQL,
+                [snapshot_row(cid, data, h) for cid, _, data, h in changed],
+                template=SNAPSHOT_TEMPLATE, page_size=len(changed)
+            )
+            refresh_company_latest(self.cur, [cid for cid, _, _, _ in changed])
+
+        self.conn.commit()
+
+        for _, slug, _, snapshot_hash in changed:
+            self.latest_hashes[slug] = snapshot_hash
+        self.total += entries
+        self.new_snapshots += len(changed)
+        self.unchanged += entries - len(changed)
+
+    def _write_rows(self, companies):
+        for company in companies:
+            try:
+                company_id = upsert_company(self.cur, company)
+                if not company_id:
+                    continue
+
+                changed = insert_snapshot_if_changed(self.cur, company_id, company)
+                self.conn.commit()
+
+                # Later batches compare against what is now stored
+                self.latest_hashes[company["slug"]] = build_snapshot(company)[1]
+                self.new_snapshots += int(changed)
+                self.unchanged += int(not changed)
+                self.total += 1
+
+            except Exception:
+                self.conn.rollback()
+                self.failed += 1
+                logger.exception(f"Error processing company {company.get('slug')}")
+
+
+def seed_rows(conn, cur, companies):
+    """
+    Row-by-row path: 2-3 round trips per company.
+    """
     total = new_snapshots = unchanged = failed = 0
 
     for idx, company in enumerate(companies, 1):
@@ -210,6 +394,87 @@ def seed_from_yc_api():
             logger.exception(f"Error processing company index {idx}")
 
     conn.commit()
+    return total, new_snapshots, unchanged, failed
+
+
+def seed_streaming(conn, cur, companies, batch_size=SEED_BATCH_SIZE):
+    """
+    Parse on this thread while a writer thread stores the previous
+    batches, so download, parsing and DB writes overlap. The bounded
+    queue holds at most SEED_QUEUE_BATCHES batches.
+    """
+    seeder = BulkSeeder(conn, cur)
+    batches = queue.Queue(maxsize=SEED_QUEUE_BATCHES)
+    error = []
+
+    def writer():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if error:
+                # Keep draining so the parser never blocks on a dead writer
+                continue
+            try:
+                seeder.write(batch)
+                logger.info(f"Processed {seeder.total + seeder.failed} companies")
+            except Exception as e:
+                # Connection-level failure; BulkSeeder handles bad rows itself
+                error.append(e)
+
+    thread = threading.Thread(target=writer, name="seed-writer", daemon=True)
+    thread.start()
+    try:
+        for batch in iter_batches(companies, batch_size):
+            batches.put(batch)
+            if error:
+                break
+    finally:
+        batches.put(None)
+        thread.join()
+
+    if error:
+        raise error[0]
+
+    return seeder.total, seeder.new_snapshots, seeder.unchanged, seeder.failed
+
+
+def peak_rss_mib():
+    """
+    Peak resident memory of this process, or None where the resource
+    module is unavailable (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def seed_from_yc_api(bulk=True, batch_size=SEED_BATCH_SIZE, source=SEED_SOURCE):
+    start_time = time.time()
+
+    conn = get_db_conn()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    ensure_projection_schema(cur)
+    conn.commit()
+
+    # scrape_runs start
+    cur.execute(
+        "INSERT INTO scrape_runs (started_at) VALUES (NOW()) RETURNING id;"
+    )
+    scrape_run_id = cur.fetchone()["id"]
+    conn.commit()
+
+    if bulk:
+        total, new_snapshots, unchanged, failed = seed_streaming(
+            conn, cur, iter_companies(source), batch_size
+        )
+    else:
+        total, new_snapshots, unchanged, failed = seed_rows(conn, cur, fetch_all_companies())
 
     elapsed = time.time() - start_time
     avg_ms = (elapsed / max(total, 1)) * 1000
@@ -238,9 +503,18 @@ def seed_from_yc_api():
     logger.info(f"Unchanged: {unchanged}")
     logger.info(f"Failed: {failed}")
     logger.info(f"Total runtime: {elapsed:.2f}s")
+    peak_mib = peak_rss_mib()
+    if peak_mib is not None:
+        logger.info(f"Peak RSS: {peak_mib:.0f} MiB")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--row-by-row", action="store_true", help="one round trip per statement (old path)")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    parser.add_argument("--source", default=SEED_SOURCE, help="local copy of all.json to read instead of downloading")
+    args = parser.parse_args()
+
     print("\n=== Seeding YC companies from YC-OSS API ===\n")
-    seed_from_yc_api()
+    seed_from_yc_api(bulk=not args.row_by_row, batch_size=args.batch_size, source=args.source)
     print("\n✓ Seeding complete. Check scraper.log and your DB.\n")